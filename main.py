@@ -1,14 +1,26 @@
 """Main script to start the orphan detection process or the analysis of detected potential orphans."""
 import argparse
 import sys
+from typing import Tuple
 
 from orphan_detection import constants
 from orphan_detection import util
 from orphan_detection import core
 from orphan_detection import analysis
+from orphan_detection import batch
 
 
 ARG_FILTER_DATE_ERROR = "[ARG ERROR] Value ARG_VALUE for arg current_sitemap_filter does not fit any supported format."
+ARG_CANONICAL_RULES_ERROR = "[ARG ERROR] Value {ARG_VALUE} for arg canonical_rules contains an unknown rule."
+ARG_PROBE_BUDGET_ERROR = "Value {ARG_VALUE} is negative or does not fit any supported format ('600s' or '1000r')."
+
+
+def probe_budget_argument(value: str) -> Tuple[float, int]:
+    """Returns the time budget (in sec) and request budget of the probe budget argument."""
+    probe_budget = util.parse_probe_budget(value)
+    if probe_budget is None:
+        raise argparse.ArgumentTypeError(ARG_PROBE_BUDGET_ERROR.format(ARG_VALUE=value))
+    return probe_budget
 
 
 def main():
@@ -24,10 +36,54 @@ def main():
     parser.add_argument("-a", dest="analysis_flag", action='store_true',
                         help="Activates the analysis process. Without this flag the detection process is started.")
 
+    parser.add_argument("-b", dest="batch_flag", action='store_true',
+                        help="Activates the batch process. The domain argument is read as path to a file with one "
+                             "domain per line. Combined with -a the analysis is started after the detection.")
+    parser.add_argument("--batch_workers", type=int, dest="batch_workers", default=constants.BATCH_DEFAULT_WORKERS,
+                        help="Max amount of domains processed at the same time in the batch process.")
+
     # orphan detection
     parser.add_argument("--current_sitemap_filter", type=str, dest="current_sitemap_filter", default=None,
                         help="Last seen dates for a page newer than "
                              "the Date Value of this argument are discarded as still part of the domain")
+    parser.add_argument("--columnar_cache", dest="columnar_cache", action='store_true',
+                        help="Build and use a memory-mapped columnar cache of the web archive data to "
+                             "extract the candidates. Speeds up reruns with different current_sitemap_filter values.")
+    parser.add_argument("--memory_budget", type=int, dest="memory_budget",
+                        default=constants.EXTRACTION_DEFAULT_MEMORY_BUDGET,
+                        help="Memory budget (in MB) for the unique urls during the candidate extraction. "
+                             "Sorted runs are spilled to disk and merged afterwards. 0 deactivates the budget.")
+
+    # download args
+    parser.add_argument("--archive_slice_years", type=int, dest="archive_slice_years",
+                        default=constants.ARCHIVE_DEFAULT_SLICE_YEARS,
+                        help="Amount of years covered by a single request to download the web archive data. "
+                             "Time slices are downloaded in parallel and resumed if interrupted. "
+                             "0 downloads all data in a single request.")
+    parser.add_argument("--archive_workers", type=int, dest="archive_workers",
+                        default=constants.ARCHIVE_DEFAULT_WORKERS,
+                        help="Max amount of parallel requests to download the time slices of the web archive data.")
+    parser.add_argument("-r", dest="refresh_flag", action='store_true',
+                        help="Refresh the newest previously downloaded web archive data with newer captures only "
+                             "instead of downloading the complete data again.")
+    parser.add_argument("--cdx_url", type=str, dest="cdx_url", default=constants.WEB_ARCHIV_CDX_URL,
+                        help="CDX endpoint to download the web archive data from.")
+
+    parser.add_argument("--canonical_rules", type=str, dest="canonical_rules",
+                        default=",".join(constants.CANONICALIZATION_DEFAULT_RULES),
+                        help="Comma separated list of rules to canonicalize candidates, candidates with the same "
+                             "canonical form are probed once: port, host and the lossy opt-in rules slash, query, www. "
+                             "Empty to disable.")
+    parser.add_argument("--filter_extensions", type=str, dest="filter_extensions",
+                        default=",".join(constants.LIST_OF_FILTER_FILE_ENDINGS),
+                        help="Comma separated list of file extensions to filter out candidates leading to a "
+                             "ressource file.")
+    parser.add_argument("--filter_workers", type=int, dest="filter_workers", default=constants.FILTER_DEFAULT_WORKERS,
+                        help="Max amount of processes to parse the candidate urls for very large candidate lists.")
+
+    parser.add_argument("--no_checkpoints", dest="no_checkpoints", action='store_true',
+                        help="Skips saving the interim results of every detection step. "
+                             "The results of the probe step are saved anyway.")
 
     # dude args
     parser.add_argument("-d", dest="dude_flag", action='store_true', help="Activate DUDe step.")
@@ -42,16 +98,59 @@ def main():
     parser.add_argument("--min_subdomain_size", type=float, dest="mss",
                         default=constants.DUDE_DEFAULT_MSS,
                         help="Min amount of pages of a single subdomain to be filtered with DUDe (DUDe Parameter)")
+    parser.add_argument("--dude_full", dest="dude_full_flag", action='store_true',
+                        help="Ignore the DUDe prefixes saved by previous runs and identify all prefixes again.")
+    parser.add_argument("--dude_workers", type=int, dest="dude_workers", default=constants.DUDE_DEFAULT_WORKERS,
+                        help="Max amount of processes to execute DUDe on large subdomains in parallel.")
 
     # probe args
     parser.add_argument("--probe_delay", type=float, dest="probe_interval",
                         default=constants.PROBE_INTERVAL,
-                        help="Cooldown time (in sec) between two requests in the probe-step. "
-                             "Smaller values mean more requests per min to the domain / infrastructure.")
+                        help="Cooldown time (in sec) between the start of two requests to the same host in the "
+                             "probe-step, kept fixed unless a min or max delay is given to adapt it to the responses "
+                             "of every host. Smaller values mean more requests per min to the domain / infrastructure.")
+    parser.add_argument("--probe_min_delay", type=float, dest="probe_min_interval", default=None,
+                        help="Min cooldown time (in sec) between two requests to the same host reached by fast "
+                             "responses in the probe-step. Defaults to the probe delay, so the rate never rises.")
+    parser.add_argument("--probe_max_delay", type=float, dest="probe_max_interval", default=None,
+                        help="Max cooldown time (in sec) between two requests to the same host reached by throttled "
+                             "(429/503), timed out or slow responses in the probe-step. Defaults to the probe delay, "
+                             "so the rate never drops.")
+    parser.add_argument("--probe_retries", type=int, dest="probe_retries", default=constants.PROBE_DEFAULT_RETRIES,
+                        help="Max amount of retries of a throttled (429/503) request in the probe-step.")
     parser.add_argument("--probe_timeout", type=float, dest="probe_timeout", default=constants.PROBE_TIMEOUT,
                         help="Time (in sec) for a single request to timeout in the probe-step. "
                              "Smaller values mean a higher potential to misinterpret a "
                              "slow response as not running any more.")
+    parser.add_argument("--probe_concurrency", type=int, dest="probe_concurrency",
+                        default=constants.PROBE_DEFAULT_CONCURRENCY,
+                        help="Max amount of requests running at the same time in the probe-step, "
+                             "requests to the same host are still separated by their adapted probe delay.")
+    parser.add_argument("--probe_cache_ttl", type=float, dest="probe_cache_ttl",
+                        default=constants.PROBE_CACHE_DEFAULT_TTL,
+                        help="Time (in hours) to reuse the probe results of previous runs for the same domain, "
+                             "0 probes all candidates again. An interrupted probe is resumed anyway.")
+    parser.add_argument("--probe_budget", type=probe_budget_argument, dest="probe_budget", default="0",
+                        help="Budget of the probe-step in seconds ('600s') or requests ('1000r'), the candidates are "
+                             "probed until the budget is exhausted. 0 is unlimited.")
+    parser.add_argument("--probe_priority", dest="probe_priority", action='store_true',
+                        help="Probe the candidates in the order of their priority (recent capture, DUDe filtered "
+                             "host, short path) instead of in random order. Useful with a probe budget.")
+
+    # http connection args
+    parser.add_argument("--http_pool_hosts", type=int, dest="http_pool_hosts",
+                        default=constants.HTTP_POOL_DEFAULT_HOSTS,
+                        help="Amount of hosts to keep the connections alive for, reused by all requests.")
+    parser.add_argument("--http_pool_size", type=int, dest="http_pool_size", default=constants.HTTP_POOL_DEFAULT_SIZE,
+                        help="Max amount of connections kept alive per host, should be at least the probe concurrency.")
+    parser.add_argument("--breaker_threshold", type=int, dest="breaker_threshold",
+                        default=constants.CIRCUIT_BREAKER_DEFAULT_THRESHOLD,
+                        help="Amount of consecutive timeouts or connection errors of an origin (scheme, host and port) "
+                             "to stop sending requests to it until its recovery is tested, 0 disables the circuit "
+                             "breakers.")
+    parser.add_argument("--breaker_recovery", type=float, dest="breaker_recovery",
+                        default=constants.CIRCUIT_BREAKER_DEFAULT_RECOVERY_TIME,
+                        help="Time (in sec) until a single request tests an origin with an open circuit breaker.")
 
     # analysis params
     # Download current page content
@@ -93,8 +192,11 @@ def main():
     # organise main args
     domain = args.domain
     pre_download_date = args.download_date
+    util.configure_http_sessions(pool_hosts=args.http_pool_hosts, pool_size=args.http_pool_size)
+    util.configure_circuit_breakers(failure_threshold=args.breaker_threshold, recovery_time=args.breaker_recovery)
 
-    if not args.analysis_flag:  # main orphan detection procedure
+    detection_params, analysis_params = {}, None
+    if args.batch_flag or not args.analysis_flag:  # main orphan detection procedure
         # current pages filter
         if args.current_sitemap_filter is None:
             current_sitemap_filter = util.get_default_current_sitemap_filter()
@@ -111,20 +213,49 @@ def main():
                                           short_prefix_cutoff=args.st,
                                           large_link_count=args.lc,
                                           large_link_len_threshold=args.lt,
-                                          subdomain_threshold=args.mss)
+                                          subdomain_threshold=args.mss,
+                                          workers=args.dude_workers,
+                                          full_recompute=args.dude_full_flag)
 
         # probe params
-        probe_params = util.ProbeParameters(timeout=args.probe_timeout, interval=args.probe_interval)
+        canonical_rules = util.compile_canonicalization_rules(args.canonical_rules.split(","))
+        if canonical_rules is None:
+            print(ARG_CANONICAL_RULES_ERROR.format(ARG_VALUE=args.canonical_rules))
+            sys.exit(1)
+        probe_params = util.ProbeParameters(timeout=args.probe_timeout, interval=args.probe_interval,
+                                            concurrency=args.probe_concurrency,
+                                            cache_ttl=args.probe_cache_ttl * 3600,
+                                            min_interval=args.probe_min_interval,
+                                            max_interval=args.probe_max_interval,
+                                            retries=args.probe_retries, canonical_rules=canonical_rules,
+                                            time_budget=args.probe_budget[0], request_budget=args.probe_budget[1],
+                                            prioritize=args.probe_priority)
 
-        # call main procedure
-        exit_code = core.orphaned_pages_detection(domain=domain,
-                                                  pre_download_date=pre_download_date,
-                                                  current_sitemap_filter=current_sitemap_filter,
-                                                  enable_dude=enable_dude, dude_params=dude_params,
-                                                  probe_params=probe_params)
-    else:
+        # download params
+        download_params = util.ArchiveDownloadParameters(cdx_url=args.cdx_url,
+                                                         slice_years=args.archive_slice_years,
+                                                         workers=args.archive_workers,
+                                                         refresh=args.refresh_flag)
+
+        # extraction params
+        extraction_params = util.ExtractionParameters(columnar_cache=args.columnar_cache,
+                                                      memory_budget=args.memory_budget)
+
+        # filter params
+        filter_params = util.FilterParameters(
+            extensions=util.compile_extension_filter(args.filter_extensions.split(",")),
+            workers=args.filter_workers)
 
-        if pre_download_date is None:
+        detection_params = {"current_sitemap_filter": current_sitemap_filter,
+                            "enable_dude": enable_dude, "dude_params": dude_params,
+                            "probe_params": probe_params,
+                            "download_params": download_params,
+                            "extraction_params": extraction_params,
+                            "filter_params": filter_params,
+                            "enable_checkpoints": not args.no_checkpoints}
+
+    if args.analysis_flag:
+        if pre_download_date is None and not args.batch_flag:
             print("[MISSING PARAMETER] The param -s [DATE] is required for the analysis process.")
             return
         # Analysis parameter objects
@@ -134,12 +265,26 @@ def main():
         os_params = util.OrphanScoreParameters(age_weight=args.os_age_weight,
                                                similarity_weight=args.os_similarity_weight,
                                                cutoff_value=args.os_cutoff)
+        analysis_params = {"current_download_params": cpd_params,
+                           "size_filter_params": sf_params,
+                           "last_seen_download_params": lspd_params,
+                           "orphan_score_params": os_params}
+
+    if args.batch_flag:  # batch procedure for a file of domains
+        exit_code = batch.batch_processing(domain_file=domain,
+                                           pre_download_date=pre_download_date,
+                                           workers=args.batch_workers,
+                                           detection_params=detection_params,
+                                           analysis_params=analysis_params)
+    elif not args.analysis_flag:
+        # call main procedure
+        exit_code = core.orphaned_pages_detection(domain=domain,
+                                                  pre_download_date=pre_download_date,
+                                                  **detection_params)
+    else:
         exit_code = analysis.analysis(domain=domain,
                                       download_date=pre_download_date,
-                                      current_download_params=cpd_params,
-                                      size_filter_params=sf_params,
-                                      last_seen_download_params=lspd_params,
-                                      orphan_score_params=os_params)
+                                      **analysis_params)
     exit(exit_code)
 
 
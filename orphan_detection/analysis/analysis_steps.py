@@ -1,5 +1,6 @@
 """This module contains the functions for every single step in the analysis chain for the identified orphan pages."""
 import time
+from collections import deque
 from typing import Dict
 
 from tqdm import tqdm
@@ -35,7 +36,7 @@ def check_needed_input_files(domain: str, download_date: str) -> int:
 
 def get_last_seen_date(data: AnalysisDataType, domain: str, download_date: str) -> int:
     """
-    Looks up and adds the last seen dates from the previously downloaded web archive data
+    Looks up and adds the last seen dates from the url index of the previously downloaded web archive data
     to the collected data in the main script.
     :param data: dictionary with the collected data
     :param domain: domain to analyse orphans for
@@ -43,21 +44,14 @@ def get_last_seen_date(data: AnalysisDataType, domain: str, download_date: str)
     :return: year the oldest page was indexed first
     """
     zipped_archive_file = constants.ZIPPED_ARCHIVE_NAME_TEMPLATE.format(DOMAIN=domain, DATE=download_date)
-    url_list_web_archive = util.read_lines_from_file(zipped_archive_file, zipped_file=True)
+    index_file = util.get_archive_index(zipped_archive_file)
 
-    oldest_page_year = 9999
+    # identify earliest year
+    oldest_timestamp = util.query_oldest_timestamp(index_file)
+    oldest_page_year = int(str(oldest_timestamp)[:4]) if oldest_timestamp is not None else 9999
 
-    # determine the last seen date for every url of the web archive data
-    last_seen_lookup = {}
-    for line in url_list_web_archive:
-        timestamp, url = line.split(" ")[:2]
-        if (url in last_seen_lookup and int(timestamp) > last_seen_lookup[url]) or url not in last_seen_lookup:
-            last_seen_lookup[url] = int(timestamp)
-
-        # identify earliest year
-        oldest_page_year = min(int(timestamp[:4]), oldest_page_year)
-
-    # look up th last seen date from the prepared lookup table and save it in the process data structure
+    # look up the last seen date from the index and save it in the process data structure
+    last_seen_lookup = util.query_last_seen_dates(index_file, list(data.keys()))
     last_seen_output = []
     for candidate in data.keys():
         last_seen_date = last_seen_lookup[candidate]
@@ -68,16 +62,18 @@ def get_last_seen_date(data: AnalysisDataType, domain: str, download_date: str)
     return oldest_page_year
 
 
-def download_page(file_name: str, url: str, **kwargs) -> str | None:
+def download_page(file_name: str, url: str, circuit_breakers: util.HostCircuitBreakers | None = None,
+                  **kwargs) -> str | None:
     """
     Downloads the content for a single url and saves it to the specified file.
     :param file_name: file to save the downloaded content to
     :param url: url to download content from
+    :param circuit_breakers: circuit breakers of the hosts, None for requests to the web archive
     :param kwargs:
     :return: error message, if error happened during download, None if everything worked fine
     """
     # Download page content
-    page_response = util.download_page_content(url, bytes_content=True, **kwargs)
+    page_response = util.download_page_content(url, bytes_content=True, circuit_breakers=circuit_breakers, **kwargs)
     if page_response.error_msg is not None:
         return f"[DOWNLOAD ERROR] {page_response.error_msg} {url}"
     content_type_header = page_response.content_header
@@ -115,6 +111,8 @@ def get_current_page_content(data: AnalysisDataType, domain: str,
                              download_params: util.ContentDownloadParameters) -> int:
     """
     Download the page in its current state and filter out any file not containing html or having a bad encoding.
+    Candidates of origins with an open circuit breaker are deferred once and downloaded after the other candidates,
+    when the origin may be tested again.
     :param data: dictionary with the collected data
     :param domain: domain to analyse orphans for
     :param download_params: parameters for the download process
@@ -122,10 +120,22 @@ def get_current_page_content(data: AnalysisDataType, domain: str,
     """
     no_html = []
     to_be_removed = []
+    circuit_breakers = util.get_circuit_breakers()
+
+    pending_candidates, deferred_candidates = deque(data.keys()), set()
+    progress_bar = tqdm(total=len(pending_candidates))
+    while pending_candidates:
+        candidate = pending_candidates.popleft()
+        delay = circuit_breakers.get_delay(util.get_url_origin(candidate), time.monotonic())
+        if delay > 0 and candidate not in deferred_candidates:
+            deferred_candidates.add(candidate)
+            pending_candidates.append(candidate)
+            continue
+        time.sleep(delay)
+        progress_bar.update()
 
-    for candidate in tqdm(data.keys()):
         page_hashed_name = util.get_md5_hash(candidate)
-        error = download_page(page_hashed_name, candidate, timeout=download_params.timeout)
+        error = download_page(page_hashed_name, candidate, circuit_breakers, timeout=download_params.timeout)
 
         # analyse response
         if error is not None:
@@ -134,6 +144,7 @@ def get_current_page_content(data: AnalysisDataType, domain: str,
             continue
         data[candidate]["current_page_file"] = page_hashed_name
         time.sleep(download_params.interval)
+    progress_bar.close()
 
     error_save_path = constants.DOWNLOAD_ERROR_C_NAME_TEMPLATE.format(DOMAIN=domain)
     util.write_lines_to_file(error_save_path, no_html)
@@ -216,6 +227,7 @@ def get_last_seen_page_content(data: AnalysisDataType, domain: str,
                                download_params: util.ContentDownloadParameters) -> int:
     """
     Download the page in its last seen state and filter out any file not containing html or having a bad encoding.
+    The requests to the web archive are not covered by the circuit breakers of the candidate hosts.
     :param data: dictionary with the collected data
     :param domain: domain to analyse orphans for
     :param download_params: parameters for the download process
@@ -230,6 +242,7 @@ def get_last_seen_page_content(data: AnalysisDataType, domain: str,
         page_hashed_name = util.get_md5_hash(f"{candidate}{last_seen_date}")
         url_web_archive = constants.WEB_ARCHIV_LAST_SEEN_VERSION.format(LAST_SEEN_DATE=last_seen_date, URL=candidate)
         error = download_page(page_hashed_name, url_web_archive, timeout=download_params.timeout)
+        time.sleep(download_params.interval)
 
         # analyse response
         if error is not None:
@@ -237,7 +250,6 @@ def get_last_seen_page_content(data: AnalysisDataType, domain: str,
             to_be_removed.append(candidate)
             continue
         data[candidate]["last_seen_page_file"] = page_hashed_name
-        time.sleep(download_params.interval)
 
     error_save_path = constants.DOWNLOAD_ERROR_LS_NAME_TEMPLATE.format(DOMAIN=domain)
     util.write_lines_to_file(error_save_path, no_html)
@@ -44,7 +44,8 @@ def solve_link(url: str, redirects: int) -> Tuple[int, str]:
     :return: Tuple of classification value and identified markers in the link
     """
     # download linked page
-    response = util.download_page_content(url, bytes_content=False, allow_redirects=True)
+    response = util.download_page_content(url, bytes_content=False, circuit_breakers=util.get_circuit_breakers(),
+                                          allow_redirects=True)
     if response.error_msg:
         return 0, f"[ERROR   RESPONSE] [LINKED URL] [{response.error_msg}] {url}"
     if response.content_header is not None or "text/html" not in response.content_header:
@@ -151,20 +152,14 @@ def check_page(content: str | bytes, url: str, redirects: int = 20) -> Tuple[int
     # find redirects
     found_marker, link_redirect = check_redirect(content)
     if found_marker:
-        if link_redirect.startswith('/'):
-            code, msg = solve_link(url + link_redirect, redirects - 1)
-        else:
-            code, msg = solve_link(link_redirect, redirects - 1)
+        code, msg = solve_link(util.resolve_link(url, link_redirect), redirects - 1)
         return code, [msg]
 
     # find frame with links
     found_marker, links = check_frames(content)
     if found_marker:
         for link in links:
-            if link.startswith('/'):
-                _, msg = solve_link(url + link, redirects - 1)
-            else:
-                _, msg = solve_link(link, redirects - 1)
+            _, msg = solve_link(util.resolve_link(url, link), redirects - 1)
             response.append(msg)
 
     # check for copyright marker
@@ -0,0 +1,72 @@
+"""This module contains all functions for the batch process to run the orphan detection for multiple domains."""
+import time
+from typing import Any, Dict
+
+from orphan_detection import util
+from orphan_detection import core
+from orphan_detection import analysis
+from orphan_detection.batch.batch_steps import read_domain_list, download_archive_data, run_isolated, write_summary
+
+__all__ = ["batch_processing"]
+
+
+def batch_processing(domain_file: str, pre_download_date: str | None, workers: int,
+                     detection_params: Dict[str, Any], analysis_params: Dict[str, Any] | None) -> int:
+    """
+    Batch process to identify potential orphans for multiple domains with a pool of worker processes.
+    :param domain_file: path to the file with one domain per line
+    :param pre_download_date: date to reuse earlier downloaded web archive data and skip download phase otherwise None
+    :param workers: max amount of domains processed at the same time
+    :param detection_params: keyword arguments for core.orphaned_pages_detection except domain and download date
+    :param analysis_params: keyword arguments for analysis.analysis except domain and download date,
+    None to skip the analysis
+    :return: exit code, 0 (OK) or 1 (NOT OK)
+    """
+    start_time = time.time()
+    domains = read_domain_list(domain_file)
+    if not domains:
+        print(f"[Error] No domains found in {domain_file}. Stopped procedure.")
+        return 1
+    print(f"Starting batch process for {len(domains)} domains with {workers} workers.")
+
+    # retrieve data from web archiv for all domains with a limited amount of parallel requests
+    download_results = {}
+    download_date = pre_download_date
+    if pre_download_date is None:
+        download_date = util.get_date()
+        print(f"Retrieving archive data for {len(domains)} domains.")
+        start_time_step = time.time()
+        download_results = download_archive_data(domains, detection_params["download_params"], download_date)
+        end_time_step = time.time()
+        print(f"Retrieving archive data for {len(domains)} domains took {end_time_step - start_time_step:.2f} seconds.")
+
+    # detection for every domain with a successful download in its own worker process
+    detection_domains = [domain for domain in domains
+                         if domain not in download_results or download_results[domain].exit_code == 0]
+    print(f"Identifying potential orphans for {len(detection_domains)} domains.")
+    start_time_step = time.time()
+    detection_results = run_isolated(core.orphaned_pages_detection, detection_domains, workers,
+                                     dict(detection_params, pre_download_date=download_date))
+    end_time_step = time.time()
+    print(f"Identifying potential orphans for {len(detection_domains)} domains "
+          f"took {end_time_step - start_time_step:.2f} seconds.")
+
+    # analysis requests go to the web archive, so they are limited by the archive workers as well
+    analysis_results = {}
+    if analysis_params is not None:
+        analysis_domains = [domain for domain in detection_domains if detection_results[domain].exit_code == 0]
+        analysis_workers = min(workers, detection_params["download_params"].workers)
+        print(f"Analysing potential orphans for {len(analysis_domains)} domains.")
+        start_time_step = time.time()
+        analysis_results = run_isolated(analysis.analysis, analysis_domains, analysis_workers,
+                                        dict(analysis_params, download_date=download_date))
+        end_time_step = time.time()
+        print(f"Analysing potential orphans for {len(analysis_domains)} domains "
+              f"took {end_time_step - start_time_step:.2f} seconds.")
+
+    print()
+    amount_failed = write_summary(domains, download_date, download_results, detection_results, analysis_results)
+    end_time = time.time()
+    print(f"Total batch procedure for {len(domains)} domains took {end_time - start_time:.2f} seconds "
+          f"with {amount_failed} failed domains.")
+    return 0 if amount_failed == 0 else 1
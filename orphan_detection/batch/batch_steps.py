@@ -0,0 +1,168 @@
+"""This module contains the functions for every single step in the batch process for multiple domains."""
+import dataclasses
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import redirect_stdout, redirect_stderr
+from typing import Any, Callable, Dict, List, Tuple
+
+from tqdm import tqdm
+
+from orphan_detection import constants
+from orphan_detection import util
+from orphan_detection.core.orphan_detection_steps import initialize_data_directory, download_web_archive_data
+
+# Type of the results collected for every domain in a single batch step
+BatchResultsType = Dict[str, util.BatchResult]
+
+
+def read_domain_list(domain_file: str) -> List[str]:
+    """
+    Read in the domains to process, one domain per line. Empty lines and lines starting with # are skipped.
+    :param domain_file: path to the file with the domains
+    :return: list of unique domains in the order of the file
+    """
+    domains = [line.strip() for line in util.read_lines_from_file(domain_file)]
+    return list(dict.fromkeys(domain for domain in domains if domain and not domain.startswith("#")))
+
+
+def download_domain(domain: str, download_params: util.ArchiveDownloadParameters, date: str) -> util.BatchResult:
+    """Download the web archive data for a single domain and return the result of the download."""
+    start_time = time.time()
+    initialize_data_directory(domain)
+    archive_data_file = download_web_archive_data(domain, download_params, date)
+    if archive_data_file == "":
+        return util.BatchResult(domain, 1, "Failed to download web archive data", time.time() - start_time)
+    return util.BatchResult(domain, 0, None, time.time() - start_time)
+
+
+def download_archive_data(domains: List[str], download_params: util.ArchiveDownloadParameters,
+                          date: str) -> BatchResultsType:
+    """
+    Download the web archive data for all domains. As every request goes to the web archive,
+    the amount of parallel requests over all domains is limited by the archive workers.
+    :param domains: domains to download the web archive data for
+    :param download_params: parameters for the download process
+    :param date: download date to save the data for
+    :return: download results for every domain
+    """
+    single_request_params = dataclasses.replace(download_params, workers=1)
+    with ThreadPoolExecutor(max_workers=download_params.workers) as executor:
+        results = executor.map(lambda domain: download_domain(domain, single_request_params, date), domains)
+        return {result.domain: result for result in results}
+
+
+def configure_worker(http_pool: Tuple[int, int], circuit_breakers: Tuple[int, float]) -> None:
+    """Applies the connection pools and circuit breakers configured in the batch process to a new worker process."""
+    util.configure_http_sessions(*http_pool)
+    util.configure_circuit_breakers(*circuit_breakers)
+
+
+def run_domain_step(step_function: Callable[..., int], domain: str, step_params: Dict[str, Any]) -> util.BatchResult:
+    """
+    Run a single process step for a domain with its output redirected to the batch log of the domain.
+    :param step_function: process step to run
+    :param domain: domain to run the process step for
+    :param step_params: parameters for the process step
+    :return: result of the process step
+    """
+    start_time = time.time()
+    initialize_data_directory(domain)
+    log_path = constants.BATCH_LOG_NAME_TEMPLATE.format(DOMAIN=domain)
+    with open(log_path, 'a', encoding=constants.DEFAULT_ENCODING) as log_file, \
+            redirect_stdout(log_file), redirect_stderr(log_file):
+        try:
+            exit_code, error_msg = step_function(domain=domain, **step_params), None
+        except Exception as exc:  # pylint: disable-msg=broad-except
+            traceback.print_exc()
+            exit_code, error_msg = 1, f"{type(exc).__name__}: {exc}"
+    return util.BatchResult(domain, exit_code, error_msg, time.time() - start_time)
+
+
+def create_worker_pool(workers: int) -> ProcessPoolExecutor:
+    """Returns a pool of worker processes, every worker process runs a single domain and is replaced afterwards."""
+    http_sessions, circuit_breakers = util.get_http_sessions(), util.get_circuit_breakers()
+    return ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1, initializer=configure_worker,
+                               initargs=((http_sessions.pool_hosts, http_sessions.pool_size),
+                                         (circuit_breakers.failure_threshold, circuit_breakers.recovery_time)))
+
+
+def run_isolated(step_function: Callable[..., int], domains: List[str], workers: int,
+                 step_params: Dict[str, Any]) -> BatchResultsType:
+    """
+    Run a process step for every domain in a pool of worker processes with a new worker process for every domain,
+    so a crashing domain does not affect the others. A crashing worker breaks the pool,
+    all domains without result are run again one by one, so only the crashing domain fails.
+    :param step_function: process step to run
+    :param domains: domains to run the process step for
+    :param workers: max amount of worker processes at the same time
+    :param step_params: parameters for the process step
+    :return: results of the process step for every domain
+    """
+    results = {}
+    with tqdm(total=len(domains)) as progress:
+        with create_worker_pool(workers) as executor:
+            futures = {executor.submit(run_domain_step, step_function, domain, step_params): domain
+                       for domain in domains}
+            for future in as_completed(futures):
+                try:
+                    results[futures[future]] = future.result()
+                except BrokenProcessPool:
+                    continue
+                progress.update(1)
+
+        # run the domains of a broken pool in separate pools
+        for domain in [domain for domain in domains if domain not in results]:
+            start_time = time.time()
+            with create_worker_pool(1) as executor:
+                try:
+                    results[domain] = executor.submit(run_domain_step, step_function, domain, step_params).result()
+                except BrokenProcessPool as exc:
+                    results[domain] = util.BatchResult(domain, 1, f"Worker crashed: {exc}", time.time() - start_time)
+            progress.update(1)
+    return results
+
+
+def format_result(result: util.BatchResult | None) -> str:
+    """Returns the summary entry for the result of a single batch step."""
+    if result is None:
+        return f"{'SKIPPED':8s} {'':>9s}"
+    status = "OK" if result.exit_code == 0 else f"ERROR({result.exit_code})"
+    return f"{status:8s} {result.duration:8.2f}s"
+
+
+def write_summary(domains: List[str], date: str, download_results: BatchResultsType,
+                  detection_results: BatchResultsType, analysis_results: BatchResultsType) -> int:
+    """
+    Write the summary report of the batch process with the result of every step for each domain.
+    :param domains: all domains of the batch process
+    :param date: download date of the web archive data
+    :param download_results: results of the download step
+    :param detection_results: results of the detection step
+    :param analysis_results: results of the analysis step
+    :return: amount of domains with at least one failed step
+    """
+    summary = [f"{'DOMAIN':40s} {'DOWNLOAD':18s} {'DETECTION':18s} {'ANALYSIS':18s} {'ORPHANS':>8s} ERROR"]
+    amount_failed = 0
+    for domain in domains:
+        domain_results = [download_results.get(domain), detection_results.get(domain), analysis_results.get(domain)]
+        errors = [result.error_msg for result in domain_results if result is not None and result.error_msg]
+        if any(result is not None and result.exit_code != 0 for result in domain_results) \
+                or detection_results.get(domain) is None:
+            amount_failed += 1
+
+        potential_orphans_path = constants.POTENTIAL_ORPHAN_LIST_NAME_TEMPLATE.format(DOMAIN=domain)
+        detection_result = detection_results.get(domain)
+        amount_orphans = len(util.read_lines_from_file(potential_orphans_path)) \
+            if detection_result is not None and detection_result.exit_code == 0 \
+            and util.is_file(potential_orphans_path) else "-"
+
+        summary.append(f"{domain:40s} {' '.join(format_result(result) for result in domain_results)} "
+                       f"{amount_orphans:>8} {'; '.join(errors)}")
+
+    summary_path = constants.BATCH_SUMMARY_NAME_TEMPLATE.format(DATE=date)
+    util.write_lines_to_file(summary_path, summary)
+    print("\n".join(summary))
+    print(f"Batch summary saved to {summary_path}.")
+    return amount_failed
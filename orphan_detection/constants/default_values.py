@@ -6,24 +6,69 @@
 # If you want to change the default sitemap filter for the get_orphan_candidates-step,
 # you have to adjust it in the util.date_operations.py file.
 
+# memory budget (in MB) for the candidate extraction, 0 keeps all unique urls in memory / in the url index
+EXTRACTION_DEFAULT_MEMORY_BUDGET = 0
+
 # dude default values
 DUDE_DEFAULT_PC = 0.05
 DUDE_DEFAULT_ST = 15
 DUDE_DEFAULT_LT = 20
 DUDE_DEFAULT_LC = 0
 DUDE_DEFAULT_MSS = 40
+DUDE_DEFAULT_WORKERS = 4
+
+# min amount of urls of a subdomain to execute dude on it in a separate process
+DUDE_PARALLEL_MIN_SUBDOMAIN_SIZE = 5000
+
+# max amount of url positions encoded in the dude character matrix, later positions are counted on the urls
+DUDE_MATRIX_MAX_WIDTH = 512
+
+# quantile of the url lengths of a subdomain used as width of the dude character matrix
+DUDE_MATRIX_WIDTH_QUANTILE = 0.99
 
 # probe params
 PROBE_INTERVAL = 0.5
 PROBE_TIMEOUT = 5
+PROBE_DEFAULT_CONCURRENCY = 16
+PROBE_CACHE_DEFAULT_TTL = 48  # hours
+PROBE_JOURNAL_MAX_AGE = 7  # days to resume an interrupted probe, independent of the probe cache
+
+# max amount of retries of throttled requests
+PROBE_DEFAULT_RETRIES = 3
+
+# circuit breakers per origin, consecutive timeouts / connection errors to open, time (in sec) until a request
+# tests the origin again and amount of failed tests to give up the origin
+CIRCUIT_BREAKER_DEFAULT_THRESHOLD = 5
+CIRCUIT_BREAKER_DEFAULT_RECOVERY_TIME = 30
+CIRCUIT_BREAKER_MAX_TRIALS = 3
+
+# connection pools of the shared http session, amount of hosts and max amount of kept connections per host
+HTTP_POOL_DEFAULT_HOSTS = 32
+HTTP_POOL_DEFAULT_SIZE = 16
 
 # File related default values
 CHMOD_USER_ONLY_FILE = 0o600
 DEFAULT_ENCODING = "utf-8"
 
 # base url for web archiv request
-WEB_ARCHIV_BASE_URL = 'https://web.archive.org/cdx/search/cdx?url={DOMAIN}&matchType=domain' \
-                      '&fl=timestamp,original,length&filter=statuscode:200'
+WEB_ARCHIV_CDX_URL = 'https://web.archive.org/cdx/search/cdx'
+WEB_ARCHIV_QUERY = '?url={DOMAIN}&matchType=domain&fl=timestamp,original,length&filter=statuscode:200'
+WEB_ARCHIV_BASE_URL = WEB_ARCHIV_CDX_URL + WEB_ARCHIV_QUERY
+
+# time slice extension for the web archiv request, FROM and TO are inclusive timestamp prefixes
+WEB_ARCHIV_TIME_SLICE = '&from={FROM}&to={TO}'
+WEB_ARCHIV_FIRST_YEAR = 1996
+
+# refresh extension for the web archiv request, FROM is an inclusive timestamp
+WEB_ARCHIV_REFRESH = '&from={FROM}'
+
+# web archive download params, a slice size of 0 years retrieves the data in a single request
+ARCHIVE_DEFAULT_SLICE_YEARS = 0
+ARCHIVE_DEFAULT_WORKERS = 2
+ARCHIVE_SLICES_MAX_AGE = 7  # days to resume an interrupted download with the time slices already finished
+
+# amount of bytes read at once while streaming the web archiv data to disk
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
 
 # base url for downloading a page in its last seen form from the web archiv
 WEB_ARCHIV_LAST_SEEN_VERSION = "https://web.archive.org/web/{LAST_SEEN_DATE}id_/{URL}"
@@ -36,8 +81,17 @@ LIST_OF_FILTER_FILE_ENDINGS = ["jpg", "gif", "css", "svg", "png", "pdf", "jpeg",
                                "m4b", "m4r", "f4b", "3gp", "3gp2", "3g2", "3gpp", "3gpp2", "oga", "ogv", "ogx", "wma",
                                "flv", "mp2", "mpeg", "mpe", "mpv", "m4p", "qt", "swf", "otf"]
 
-# pylint: disable-msg=anomalous-backslash-in-string
-FILTER_REGEX = f".+\.({'|'.join(LIST_OF_FILTER_FILE_ENDINGS)}).*$"  # noqa: W605
+# rules to canonicalize candidate urls, candidates with the same canonical form are probed once
+CANONICALIZATION_RULES = ["port", "host", "slash", "query", "www"]
+# default rules only merge urls which always lead to the same page, slash, query and www are opt-in
+CANONICALIZATION_DEFAULT_RULES = ["port", "host"]
+
+# min amount of urls to parse them in multiple processes
+FILTER_PARALLEL_THRESHOLD = 1000000
+FILTER_DEFAULT_WORKERS = 4
+
+# batch params
+BATCH_DEFAULT_WORKERS = 4
 
 # Analysis constants
 # default param values
@@ -11,11 +11,21 @@ DOMAIN_TMP_DIRECTORY = TMP_DIRECTORY + "{DOMAIN}/"  # Folder to store temporary
 
 # file name templates
 ZIPPED_ARCHIVE_NAME_TEMPLATE = ARCHIVE_DATA_DIRECTORY + "{DOMAIN}_{DATE}.txt.gz"
+ARCHIVE_INDEX_NAME_TEMPLATE = "{ARCHIVE_FILE}.sqlite"  # url index next to the web archive data file
+ARCHIVE_COLUMNS_DIRECTORY_TEMPLATE = "{ARCHIVE_FILE}.columns/"  # columnar cache next to the web archive data file
+
+ARCHIVE_SLICES_DIRECTORY = DOMAIN_TMP_DIRECTORY + "archive_slices/"  # Location of partially downloaded archive data
+ARCHIVE_SLICE_NAME_TEMPLATE = ARCHIVE_SLICES_DIRECTORY + "{DOMAIN}_{FROM}_{TO}.txt.gz"
+ARCHIVE_SLICES_JOURNAL_NAME_TEMPLATE = ARCHIVE_SLICES_DIRECTORY + "{DOMAIN}_finished_slices.txt"
+ARCHIVE_REFRESH_NAME_TEMPLATE = DOMAIN_TMP_DIRECTORY + "{DOMAIN}_archive_refresh.txt.gz"
 
 CURRENT_UNIQUE_URL_NAME_TEMPLATE = DOMAIN_TMP_DIRECTORY + "{DOMAIN}_unique_links_{FILTER}.txt"
 TOTAL_UNIQUE_URL_NAME_TEMPLATE = DOMAIN_TMP_DIRECTORY + "{DOMAIN}_unique_links_total.txt"
 
+SORT_RUNS_DIRECTORY = DOMAIN_TMP_DIRECTORY + "sort_runs/"  # Location of sorted runs for the external memory mode
+
 CANDIDATES_LIST_NAME_TEMPLATE = DOMAIN_TMP_DIRECTORY + "{DOMAIN}_orphan_candidates.txt"
+CANONICAL_GROUPS_NAME_TEMPLATE = DOMAIN_TMP_DIRECTORY + "{DOMAIN}_canonical_groups.txt"  # equivalent candidates
 CANDIDATES_FILTERED_LIST_NAME_TEMPLATE = DOMAIN_TMP_DIRECTORY + "{DOMAIN}_orphan_candidates_filtered.txt"
 
 STATUS_CODES_LIST_NAME_TEMPLATE = DOMAIN_TMP_DIRECTORY + "{DOMAIN}_status_codes.txt"
@@ -23,9 +33,20 @@ DUDE_EXCLUDED_LIST_NAME_TEMPLATE = DOMAIN_TMP_DIRECTORY + "{DOMAIN}_dude_exclude
 DUDE_EXCLUDED_PREFIXES_NAME_TEMPLATE = DOMAIN_TMP_DIRECTORY + "{DOMAIN}_dude_prefix_excluded.txt"
 
 ERROR_RESPONSES_LIST_NAME_TEMPLATE = DOMAIN_TMP_DIRECTORY + "{DOMAIN}_error_responses.txt"
+PROBE_JOURNAL_NAME_TEMPLATE = DOMAIN_TMP_DIRECTORY + "{DOMAIN}_probe_journal.txt"  # results of an interrupted probe
+PROBE_RATES_NAME_TEMPLATE = DOMAIN_TMP_DIRECTORY + "{DOMAIN}_probe_rates.txt"  # effective request rate per host
+
+DUDE_MODEL_NAME_TEMPLATE = DOMAIN_DIRECTORY + "{DOMAIN}_dude_model.json"  # prefixes of previous runs per subdomain
+PROBE_CACHE_NAME_TEMPLATE = DOMAIN_DIRECTORY + "{DOMAIN}_probe_cache.sqlite"  # probe results of previous runs
 
 CANDIDATES_TO_PROBE_LIST_NAME_TEMPLATE = DOMAIN_DIRECTORY + "{DOMAIN}_list_to_probe.txt"
 POTENTIAL_ORPHAN_LIST_NAME_TEMPLATE = DOMAIN_DIRECTORY + "{DOMAIN}_potential_orphans.txt"
+NOT_PROBED_LIST_NAME_TEMPLATE = DOMAIN_DIRECTORY + "{DOMAIN}_not_probed.txt"  # candidates left after the probe budget
+
+
+# Batch templates
+BATCH_LOG_NAME_TEMPLATE = DOMAIN_DIRECTORY + "{DOMAIN}_batch_log.txt"
+BATCH_SUMMARY_NAME_TEMPLATE = RESULT_DIRECTORY + "batch_summary_{DATE}.txt"
 
 
 # Analysis templates
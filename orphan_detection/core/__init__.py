@@ -6,16 +6,20 @@ from orphan_detection import constants
 from orphan_detection import util
 
 from orphan_detection.core.orphan_detection_steps import initialize_data_directory, \
-    download_web_archive_data, get_orphan_candidates, filter_file_extensions, check_status_codes
+    download_web_archive_data, get_orphan_candidates, filter_file_extensions, prioritize_candidates, \
+    check_status_codes
 
 from orphan_detection.core.dynamic_url_detection import dynamic_url_detection
 
 __all__ = ["orphaned_pages_detection"]
 
 
-def orphaned_pages_detection(domain: str, pre_download_date: str | None, current_sitemap_filter: datetime.date,
-                             enable_dude: True, dude_params: util.DUDEParameters,
-                             probe_params: util.ProbeParameters) -> int:
+def orphaned_pages_detection(domain: str, pre_download_date: str | None,  # pylint: disable-msg=too-many-arguments
+                             current_sitemap_filter: datetime.date, enable_dude: True,
+                             dude_params: util.DUDEParameters, probe_params: util.ProbeParameters,
+                             download_params: util.ArchiveDownloadParameters,
+                             extraction_params: util.ExtractionParameters, filter_params: util.FilterParameters,
+                             enable_checkpoints: bool = True) -> int:
     """
     Main process to identify potential orphans for a single domain.
     :param domain: domain to identify potential orphans for
@@ -24,6 +28,10 @@ def orphaned_pages_detection(domain: str, pre_download_date: str | None, current
     :param enable_dude: True if the DUDe filter should be applied
     :param dude_params: params for the DUDe step in an util.DUDEParameters-object
     :param probe_params: params for the probe step in an util.ProbeParameters-object
+    :param download_params: params for the download step in an util.ArchiveDownloadParameters-object
+    :param extraction_params: params for the candidate extraction step in an util.ExtractionParameters-object
+    :param filter_params: params for the file extension filter step in an util.FilterParameters-object
+    :param enable_checkpoints: True if the interim results of every step should be saved in the background
     :return: exit code, 0 (OK) or 1 (NOT OK)
     """
     start_time = time.time()
@@ -37,7 +45,7 @@ def orphaned_pages_detection(domain: str, pre_download_date: str | None, current
     if pre_download_date is None:
         print(f"Retrieving archive data for {domain}.")
         start_time_step = time.time()
-        archive_data_file = download_web_archive_data(domain)
+        archive_data_file = download_web_archive_data(domain, download_params)
         end_time_step = time.time()
         print(f"Retrieving archive data for {domain} took {end_time_step - start_time_step:.2f} seconds.")
     else:
@@ -48,43 +56,52 @@ def orphaned_pages_detection(domain: str, pre_download_date: str | None, current
         print(f"[Error] No archive data file found at path {archive_data_file}. Stopped procedure.")
         return 1
 
-    print(f"Extracting candidate orphan pages for {domain}.")
-    start_time_step = time.time()
-    amount_orphan_candidates = get_orphan_candidates(archive_data_file, current_sitemap_filter, domain)
-    end_time_step = time.time()
-    print(f"Extracting candidate orphan pages for {domain} took {end_time_step - start_time_step:.2f} seconds, "
-          f"and resulted in {amount_orphan_candidates} pages.")
-
-    print(f"Filtering out list of file extensions for {domain}.")
-    start_time_step = time.time()
-    amount_orphan_candidates = filter_file_extensions(domain)
-    end_time_step = time.time()
-    print(f"Filtering out list of file extensions for {domain} took {end_time_step - start_time_step:.2f} seconds, "
-          f"and resulted in {amount_orphan_candidates} pages.")
-
-    if enable_dude:
-        print(f"Performing Dynamic URL Detection for {domain}.")
+    with util.CheckpointWriter(enabled=enable_checkpoints) as checkpoints:
+        print(f"Extracting candidate orphan pages for {domain}.")
         start_time_step = time.time()
-        amount_before_dude = amount_orphan_candidates
+        orphan_candidates = get_orphan_candidates(archive_data_file, current_sitemap_filter, domain,
+                                                  extraction_params, checkpoints)
+        end_time_step = time.time()
+        print(f"Extracting candidate orphan pages for {domain} took {end_time_step - start_time_step:.2f} seconds, "
+              f"and resulted in {len(orphan_candidates)} pages.")
+
+        print(f"Filtering out list of file extensions for {domain}.")
+        start_time_step = time.time()
+        parsed_candidates = filter_file_extensions(domain, orphan_candidates, filter_params, checkpoints)
+        orphan_candidates = parsed_candidates.urls
+        end_time_step = time.time()
+        print(f"Filtering out list of file extensions for {domain} took {end_time_step - start_time_step:.2f} "
+              f"seconds, and resulted in {len(orphan_candidates)} pages.")
 
-        amount_orphan_candidates = dynamic_url_detection(domain, dude_params)
+        if enable_dude:
+            print(f"Performing Dynamic URL Detection for {domain}.")
+            start_time_step = time.time()
 
-        if amount_before_dude != 0:
-            reduction = (amount_before_dude * 100 - amount_orphan_candidates * 100) / amount_before_dude
-        else:
-            reduction = 0
+            # the parsed candidates keep the list before DUDe
+            orphan_candidates = dynamic_url_detection(domain, parsed_candidates, dude_params, checkpoints)
 
+            if parsed_candidates.urls:
+                reduction = 100 - len(orphan_candidates) * 100 / len(parsed_candidates.urls)
+            else:
+                reduction = 0
+
+            end_time_step = time.time()
+            print(f"Performing Dynamic URL Detection for {domain} took {end_time_step - start_time_step:.2f} "
+                  f"seconds, and resulted in {len(orphan_candidates)} pages. This is a reduction of {reduction:.2f}%.")
+
+        amount_probe_urls = len(orphan_candidates)
+        print(f"Checking status codes for {amount_probe_urls} pages on {domain} "
+              f"and extracting links with status code 200.")
+        start_time_step = time.time()
+        if probe_params.prioritize:
+            orphan_candidates = prioritize_candidates(archive_data_file, parsed_candidates, orphan_candidates,
+                                                      dude_params if enable_dude else None)
+        orphan_candidates = check_status_codes(domain, orphan_candidates, probe_params,
+                                               shuffle=not probe_params.prioritize)
         end_time_step = time.time()
-        print(f"Performing Dynamic URL Detection for {domain} took {end_time_step - start_time_step:.2f} seconds, "
-              f"and resulted in {amount_orphan_candidates} pages. This is a reduction of {reduction:.2f}%.")
-
-    amount_probe_urls = amount_orphan_candidates
-    print(f"Checking status codes for {amount_probe_urls} pages on {domain} and extracting links with status code 200.")
-    start_time_step = time.time()
-    amount_orphan_candidates = check_status_codes(domain, probe_params)
-    end_time_step = time.time()
-    print(f"Checking status codes for {amount_probe_urls} pages on {domain} and extracting links with status code 200 "
-          f"took {end_time_step - start_time_step:.2f} seconds, and resulted in {amount_orphan_candidates} pages.")
+        print(f"Checking status codes for {amount_probe_urls} pages on {domain} and extracting links with status "
+              f"code 200 took {end_time_step - start_time_step:.2f} seconds, "
+              f"and resulted in {len(orphan_candidates)} pages.")
 
     # Finish timing for domain
     end_time = time.time()
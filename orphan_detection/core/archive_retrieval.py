@@ -0,0 +1,167 @@
+"""This file contains all functions to retrieve the web archive data for a single domain in separate time slices
+or as refresh of a previous download."""
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Set, Tuple
+
+from orphan_detection import constants
+from orphan_detection import util
+
+TimeSlice = Tuple[int, int]
+
+
+def get_time_slices(slice_years: int) -> List[TimeSlice]:
+    """
+    Split the time range from the first year of the web archive until the current year into time slices.
+    :param slice_years: amount of years covered by a single time slice
+    :return: list of time slices as tuples of the first and the last year (inclusive)
+    """
+    current_year = util.get_current_year()
+    return [(from_year, min(from_year + slice_years - 1, current_year))
+            for from_year in range(constants.WEB_ARCHIV_FIRST_YEAR, current_year + 1, slice_years)]
+
+
+def get_time_slice_file(domain: str, time_slice: TimeSlice) -> str:
+    """Returns the path of the file containing the web archive data of a single time slice."""
+    return constants.ARCHIVE_SLICE_NAME_TEMPLATE.format(DOMAIN=domain, FROM=time_slice[0], TO=time_slice[1])
+
+
+def download_time_slice(domain: str, query_url: str, time_slice: TimeSlice) -> str | None:
+    """
+    Download the web archive data of a single time slice.
+    :param domain: domain to download the web archive data for
+    :param query_url: web archive request url for the whole domain
+    :param time_slice: time slice to download the data for
+    :return: error message, if error happened during download, None if everything worked fine
+    """
+    slice_url = query_url + constants.WEB_ARCHIV_TIME_SLICE.format(FROM=time_slice[0], TO=time_slice[1])
+    return util.download_to_gzip_file(slice_url, get_time_slice_file(domain, time_slice))
+
+
+def read_finished_slices(journal_path: str, journal_header: Dict[str, Any]) -> Set[str]:
+    """
+    Read the time slices finished by an interrupted download from the journal. The first line of the journal holds
+    its creation time and the parameters of the download.
+    :param journal_path: path to the journal of the time sliced download
+    :param journal_header: parameters of the current download
+    :return: finished time slices, empty if the journal is missing, older than the max age or of another download
+    """
+    if not util.is_file(journal_path):
+        return set()
+    header, *finished_slices = util.read_lines_from_file(journal_path) or [""]
+    try:
+        recorded_header = json.loads(header)
+        created_at = recorded_header.pop("created_at")
+    except (ValueError, TypeError, KeyError, AttributeError):  # journal without or with a cut off header
+        return set()
+    if recorded_header != journal_header or created_at < time.time() - constants.ARCHIVE_SLICES_MAX_AGE * 86400:
+        return set()
+    return set(finished_slices)
+
+
+def download_time_sliced(domain: str, query_url: str, zipped_archive_file: str,
+                         download_params: util.ArchiveDownloadParameters) -> str | None:
+    """
+    Download the web archive data in time slices with multiple parallel requests and merge them afterwards.
+    Finished time slices are recorded in a journal, so an interrupted download resumes with the missing slices.
+    The journal is discarded after the max age or for another query, the slice with the current year is always
+    downloaded again to get the latest captures.
+    :param domain: domain to download the web archive data for
+    :param query_url: web archive request url for the whole domain
+    :param zipped_archive_file: path to the file to save the merged web archive data to
+    :param download_params: parameters for the download process
+    :return: error message, if error happened during download, None if everything worked fine
+    """
+    slices_directory = constants.ARCHIVE_SLICES_DIRECTORY.format(DOMAIN=domain)
+    journal_path = constants.ARCHIVE_SLICES_JOURNAL_NAME_TEMPLATE.format(DOMAIN=domain)
+    time_slices = get_time_slices(download_params.slice_years)
+    journal_header = {"query_url": query_url, "slice_years": download_params.slice_years,
+                      "from": time_slices[0][0], "to": time_slices[-1][1]}
+
+    # identify time slices still missing from a previous interrupted download, the current one is never finished
+    finished_slices = read_finished_slices(journal_path, journal_header)
+    if not finished_slices:  # start a new journal without the partial data of another download
+        util.delete_directory(slices_directory)
+        util.create_directory(slices_directory)
+        util.append_line_to_file(journal_path, json.dumps({"created_at": time.time(), **journal_header}))
+    finished_slices.discard(f"{time_slices[-1][0]}-{time_slices[-1][1]}")
+    open_slices = [time_slice for time_slice in time_slices
+                   if f"{time_slice[0]}-{time_slice[1]}" not in finished_slices
+                   or not util.is_file(get_time_slice_file(domain, time_slice))]
+    if len(open_slices) < len(time_slices):
+        print(f"Resuming download with {len(time_slices) - len(open_slices)} of {len(time_slices)} "
+              f"time slices already finished.")
+
+    # download missing time slices in parallel and record every finished one
+    failed_slices = []
+    with ThreadPoolExecutor(max_workers=download_params.workers) as executor:
+        futures = {executor.submit(download_time_slice, domain, query_url, time_slice): time_slice
+                   for time_slice in open_slices}
+        for future in as_completed(futures):
+            time_slice = futures[future]
+            error_msg = future.result()
+            if error_msg is not None:
+                failed_slices.append(f"{time_slice[0]}-{time_slice[1]} ({error_msg})")
+                continue
+            util.append_line_to_file(journal_path, f"{time_slice[0]}-{time_slice[1]}")
+
+    if failed_slices:
+        return f"Failed time slices {', '.join(sorted(failed_slices))}"
+
+    # merge all time slices into the archive file and remove the partial data
+    util.merge_gzip_files([get_time_slice_file(domain, time_slice) for time_slice in time_slices],
+                          zipped_archive_file)
+    util.delete_directory(slices_directory)
+    return None
+
+
+def find_latest_archive_file(domain: str) -> str | None:
+    """
+    Identify the newest previously downloaded web archive data file for given domain.
+    :param domain: domain to find the web archive data for
+    :return: path to the newest web archive data file, None if no file exists
+    """
+    archive_file_regex = re.compile(re.escape(f"{domain}_") + r"(\d{4}-\d{2}-\d{2})" + re.escape(".txt.gz"))
+    download_dates = [match.group(1) for match in map(archive_file_regex.fullmatch,
+                                                      util.list_files(constants.ARCHIVE_DATA_DIRECTORY))
+                      if match is not None]
+    if not download_dates:
+        return None
+    return constants.ZIPPED_ARCHIVE_NAME_TEMPLATE.format(DOMAIN=domain, DATE=max(download_dates))
+
+
+def get_latest_timestamp(zipped_archive_file: str) -> str | None:
+    """Returns the timestamp of the newest capture in given web archive data file, None if the file has no entries."""
+    latest_timestamp = None
+    for web_archive_line in util.iterate_lines_from_file(zipped_archive_file, zipped_file=True):
+        timestamp = web_archive_line[:14]
+        if timestamp and (latest_timestamp is None or timestamp > latest_timestamp):
+            latest_timestamp = timestamp
+    return latest_timestamp
+
+
+def download_refresh(domain: str, query_url: str, previous_archive_file: str, zipped_archive_file: str) -> str | None:
+    """
+    Download only the captures newer than the latest capture of a previous download
+    and merge them with the previous data into a new web archive data file.
+    :param domain: domain to download the web archive data for
+    :param query_url: web archive request url for the whole domain
+    :param previous_archive_file: path to the previously downloaded web archive data
+    :param zipped_archive_file: path to the file to save the merged web archive data to
+    :return: error message, if error happened during download, None if everything worked fine
+    """
+    latest_timestamp = get_latest_timestamp(previous_archive_file)
+    if latest_timestamp is not None:
+        print(f"Refreshing {previous_archive_file} with captures newer than {latest_timestamp}.")
+        query_url += constants.WEB_ARCHIV_REFRESH.format(FROM=int(latest_timestamp) + 1)
+
+    refresh_file = constants.ARCHIVE_REFRESH_NAME_TEMPLATE.format(DOMAIN=domain)
+    error_msg = util.download_to_gzip_file(query_url, refresh_file)
+    if error_msg is not None:
+        return error_msg
+
+    util.merge_gzip_files([previous_archive_file, refresh_file], zipped_archive_file)
+    util.delete_file(refresh_file)
+    return None
@@ -0,0 +1,137 @@
+"""This file contains all functions for the character matrix of the urls of a single subdomain,
+used by the Dynamic url detection (DUDe) step to count the characters at each position vectorized."""
+from collections import Counter
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+from orphan_detection import constants
+
+# code of the padding after the end of an url, never counted as character
+PADDING_CODE = 0
+
+# amount of urls encoded at once
+MATRIX_CHUNK_SIZE = 65536
+
+
+@dataclass(frozen=True, slots=True)
+class CharacterMatrix:
+    """Data Carrier class for the character codes of all urls of a subdomain, one zero-padded url per row.
+    The urls are kept with their schemas, the offset of every url is the length of its schema."""
+    urls: List[str]
+    offsets: List[int]
+    codes: np.ndarray
+    lengths: np.ndarray
+    alphabet: np.ndarray
+
+
+def get_matrix_width(lengths: np.ndarray) -> int:
+    """Returns the amount of positions to encode, long outliers are not encoded completely."""
+    if len(lengths) == 0:
+        return 1
+    width = int(np.ceil(np.quantile(lengths, constants.DUDE_MATRIX_WIDTH_QUANTILE)))
+    return max(1, min(width, constants.DUDE_MATRIX_MAX_WIDTH))
+
+
+def build_character_matrix(urls: List[str], offsets: List[int]) -> CharacterMatrix:
+    """
+    Encode all urls without their schemas as rows of a padded character code matrix.
+    ASCII urls are encoded by their code points, otherwise the characters are mapped
+    to a compacted alphabet sorted by code point.
+    :param urls: list with all urls of a subdomain
+    :param offsets: length of the schema of every url
+    :return: character matrix of the urls
+    """
+    lengths = np.fromiter((len(url) - offset for url, offset in zip(urls, offsets)), dtype=np.int64,
+                          count=len(urls))
+    width = get_matrix_width(lengths)
+
+    if all(url.isascii() for url in urls):
+        # encode the urls in chunks to keep the temporary padded strings small
+        codes = np.empty((len(urls), width), dtype=np.uint8)
+        for chunk_start in range(0, len(urls), MATRIX_CHUNK_SIZE):
+            chunk_end = min(chunk_start + MATRIX_CHUNK_SIZE, len(urls))
+            padded_urls = "".join(url[offset:offset + width].ljust(width, chr(PADDING_CODE))
+                                  for url, offset in zip(urls[chunk_start:chunk_end], offsets[chunk_start:chunk_end]))
+            codes[chunk_start:chunk_end] = \
+                np.frombuffer(padded_urls.encode("ascii"), dtype=np.uint8).reshape(chunk_end - chunk_start, width)
+        alphabet = np.array([chr(code_point) for code_point in range(128)])
+    else:
+        padded_urls = "".join(url[offset:offset + width].ljust(width, chr(PADDING_CODE))
+                              for url, offset in zip(urls, offsets))
+        code_points = np.frombuffer(padded_urls.encode("utf-32-le"), dtype=np.uint32)
+        unique_code_points = np.union1d([PADDING_CODE], code_points)
+        codes = np.searchsorted(unique_code_points, code_points)
+        codes = codes.astype(np.uint8 if len(unique_code_points) <= 256 else np.uint16).reshape(len(urls), width)
+        alphabet = np.array([chr(code_point) for code_point in unique_code_points.tolist()])
+
+    return CharacterMatrix(urls=urls, offsets=offsets, codes=codes, lengths=lengths, alphabet=alphabet)
+
+
+def get_url(char_matrix: CharacterMatrix, row: int) -> str:
+    """Returns the url of given row without its schema."""
+    return char_matrix.urls[row][char_matrix.offsets[row]:]
+
+
+def sort_rows(char_matrix: CharacterMatrix) -> np.ndarray:
+    """
+    Sort all rows by their urls without schema. The rows are sorted by their character codes,
+    rows with the same codes as an url longer than the matrix are sorted by their urls afterwards.
+    :param char_matrix: character matrix of all urls
+    :return: rows in the order of their urls
+    """
+    # big endian codes compare byte by byte in the same order as the characters
+    codes = char_matrix.codes if char_matrix.codes.itemsize == 1 else char_matrix.codes.astype(">u2")
+    row_keys = np.ascontiguousarray(codes).view(f"S{codes.shape[1] * codes.itemsize}").ravel()
+    sorted_rows = np.argsort(row_keys, kind="stable")
+
+    sorted_keys = set()
+    for row in np.flatnonzero(char_matrix.lengths > codes.shape[1]).tolist():
+        row_key = row_keys[row]
+        if row_key in sorted_keys:
+            continue
+        sorted_keys.add(row_key)
+        key_start = np.searchsorted(row_keys, row_key, side="left", sorter=sorted_rows)
+        key_end = np.searchsorted(row_keys, row_key, side="right", sorter=sorted_rows)
+        sorted_rows[key_start:key_end] = sorted(sorted_rows[key_start:key_end].tolist(),
+                                                key=lambda key_row: get_url(char_matrix, key_row))
+    return sorted_rows
+
+
+def count_characters_per_position(char_matrix: CharacterMatrix, rows: np.ndarray, length: int) -> np.ndarray:
+    """
+    Count characters at each position for the urls of the given rows.
+    :param char_matrix: character matrix of all urls
+    :param rows: row indices of the urls to count the characters for
+    :param length: amount of positions to count, limited by the width of the matrix
+    :return: matrix with the amount of every character code (columns) at each position (rows)
+    """
+    width = min(length, char_matrix.codes.shape[1])
+    row_codes = char_matrix.codes[rows, :width]
+    counters = np.empty((width, len(char_matrix.alphabet)), dtype=np.int64)
+    for position in range(width):
+        counters[position] = np.bincount(row_codes[:, position], minlength=len(char_matrix.alphabet))
+    counters[:, PADDING_CODE] = 0
+    return counters
+
+
+def generate_prefix(char_matrix: CharacterMatrix, rows: np.ndarray, avg_len: int) -> str:
+    """
+    Generate the prefix from the most occurring characters for each position,
+    ties are resolved by the smallest character.
+    :param char_matrix: character matrix of all urls
+    :param rows: row indices of the urls to generate the prefix from
+    :param avg_len: average len of all urls
+    :return: generated prefix
+    """
+    counters = count_characters_per_position(char_matrix, rows, avg_len)
+    generated_prefix = "".join(char_matrix.alphabet[counters.argmax(axis=1)].tolist())
+
+    # positions behind the width of the matrix are counted on the urls directly
+    long_rows = rows[char_matrix.lengths[rows] > len(generated_prefix)].tolist()
+    for position in range(len(generated_prefix), avg_len):
+        counter = Counter(char_matrix.urls[row][char_matrix.offsets[row] + position] for row in long_rows
+                          if char_matrix.lengths[row] > position)
+        generated_prefix += min(counter.items(), key=lambda item: (-item[1], item[0]))[0]
+    return generated_prefix
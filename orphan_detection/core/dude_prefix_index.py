@@ -0,0 +1,113 @@
+"""This file contains the prefix index over the urls of a single subdomain, used by the Dynamic url detection (DUDe)
+step to count and remove the urls matching a prefix without scanning all candidates."""
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import FrozenSet, List
+
+import numpy as np
+
+from orphan_detection.core.dude_character_matrix import CharacterMatrix, build_character_matrix, get_url, sort_rows
+
+
+@dataclass(frozen=True, slots=True)
+class CandidateScope:
+    """Data Carrier class for a set of candidates in the prefix index. The candidates are all alive indexed urls
+    between start (inclusive) and end (exclusive) and the listed ambiguous urls."""
+    start: int
+    end: int
+    ambiguous_rows: FrozenSet[int]
+
+
+class FenwickTree:
+    """Binary indexed tree over the alive flags of all indexed urls to count alive urls of a range in log time."""
+
+    def __init__(self, size: int):
+        # every url is alive at the beginning, a node covers as many flags as its lowest set bit
+        indices = np.arange(size + 1, dtype=np.int64)
+        self.tree = array('q', (indices & -indices).tobytes())
+
+    def add(self, position: int, delta: int) -> None:
+        """Adds delta to the flag at given position."""
+        index = position + 1
+        while index < len(self.tree):
+            self.tree[index] += delta
+            index += index & -index
+
+    def prefix_sum(self, end: int) -> int:
+        """Returns the sum of all flags before given position."""
+        total = 0
+        while end > 0:
+            total += self.tree[end]
+            end -= end & -end
+        return total
+
+    def range_sum(self, start: int, end: int) -> int:
+        """Returns the sum of all flags between start (inclusive) and end (exclusive)."""
+        return self.prefix_sum(end) - self.prefix_sum(start)
+
+
+class SortedUrls(Sequence):
+    """Read only view of the urls without schemas of the character matrix in sorted order, used for binary search."""
+
+    def __init__(self, char_matrix: CharacterMatrix, sorted_rows: np.ndarray):
+        self.char_matrix = char_matrix
+        self.sorted_rows = sorted_rows.tolist()
+
+    def __len__(self) -> int:
+        return len(self.sorted_rows)
+
+    def __getitem__(self, index):
+        return get_url(self.char_matrix, self.sorted_rows[index])
+
+
+class DudePrefixIndex:
+    """
+    Sorted index over all urls of a subdomain. All urls start with the subdomain and every prefix generated by DUDe
+    starts with it (or is part of it), so a prefix is contained in an url exactly if the url starts with the prefix.
+    The urls matching a prefix are a range of the sorted urls. Only urls containing the subdomain a second time
+    can contain the prefix elsewhere, those ambiguous urls are checked one by one.
+    The urls are indexed without their schemas, the rows of the index are the positions in the given list of urls.
+    """
+
+    def __init__(self, url_list: List[str], schema_lengths: List[int], subdomain: str):
+        self.char_matrix: CharacterMatrix = build_character_matrix(url_list, schema_lengths)
+        is_ambiguous = np.fromiter((url.find(subdomain, offset + 1) != -1
+                                    for url, offset in zip(url_list, schema_lengths)), dtype=bool, count=len(url_list))
+        sorted_rows = sort_rows(self.char_matrix)
+
+        self.sorted_rows = sorted_rows[~is_ambiguous[sorted_rows]]
+        self.sorted_urls = SortedUrls(self.char_matrix, self.sorted_rows)
+        self.alive = np.ones(len(self.sorted_rows), dtype=bool)
+        self.alive_counter = FenwickTree(len(self.sorted_rows))
+        self.root_scope = CandidateScope(0, len(self.sorted_rows), frozenset(np.flatnonzero(is_ambiguous).tolist()))
+
+    def count(self, scope: CandidateScope) -> int:
+        """Returns the amount of candidates in given scope."""
+        return self.alive_counter.range_sum(scope.start, scope.end) + len(scope.ambiguous_rows)
+
+    def get_rows(self, scope: CandidateScope) -> np.ndarray:
+        """Returns the rows of all candidates in given scope, which are their positions in the list of urls."""
+        indexed_rows = self.sorted_rows[scope.start + np.flatnonzero(self.alive[scope.start:scope.end])]
+        return np.concatenate([indexed_rows, np.array(sorted(scope.ambiguous_rows), dtype=indexed_rows.dtype)])
+
+    def match(self, scope: CandidateScope, prefix: str) -> CandidateScope:
+        """Returns the scope of all candidates in given scope containing the prefix."""
+        start = max(bisect_left(self.sorted_urls, prefix), scope.start)
+        end = scope.end
+        if prefix:
+            # first string sorted behind all strings starting with the prefix
+            prefix_end = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+            end = min(bisect_left(self.sorted_urls, prefix_end), scope.end)
+        urls, offsets = self.char_matrix.urls, self.char_matrix.offsets
+        ambiguous_rows = frozenset(row for row in scope.ambiguous_rows if urls[row].find(prefix, offsets[row]) != -1)
+        return CandidateScope(start, max(start, end), ambiguous_rows)
+
+    def remove(self, scope: CandidateScope, matched_scope: CandidateScope) -> CandidateScope:
+        """Removes the matched candidates from the index and returns the scope of the remaining candidates."""
+        matched_positions = matched_scope.start + np.flatnonzero(self.alive[matched_scope.start:matched_scope.end])
+        self.alive[matched_positions] = False
+        for position in matched_positions.tolist():
+            self.alive_counter.add(position, -1)
+        return CandidateScope(scope.start, scope.end, scope.ambiguous_rows - matched_scope.ambiguous_rows)
@@ -1,265 +1,377 @@
 """This file contains all functions for the Dynamic url detection (DUDe) step."""
-from typing import List, Tuple, Dict, Set
+import os
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import FrozenSet, List, Tuple, Dict
+
+import numpy as np
 
 from orphan_detection import constants
 from orphan_detection import util
 
+from orphan_detection.core.dude_character_matrix import generate_prefix
+from orphan_detection.core.dude_prefix_index import CandidateScope, DudePrefixIndex
 
 HTTP_SCHEMA = "http://"
 HTTPS_SCHEMA = "https://"
 
-DudeReturnType = Tuple[List[str], List[str], List[str]]
+DudeReturnType = Tuple[np.ndarray, np.ndarray, List[str]]
+DudeMainReturnType = Tuple[List[str], List[str], Dict[str, List[str]]]
+DudeModel = Dict[str, List[str]]
+
+
+@dataclass(frozen=True, slots=True)
+class CandidateStore:
+    """Data Carrier class for the candidate urls with the length of their schemas and the end of their hosts.
+    Urls only differing in their schemas share the same id, which is the position of the first of them."""
+    urls: List[str]
+    schema_lengths: np.ndarray
+    host_ends: np.ndarray
+    url_ids: np.ndarray
 
 
-def dynamic_url_detection(domain: str, dude_params: util.DUDEParameters) -> int:
+def dynamic_url_detection(domain: str, candidates: util.ParsedUrls, dude_params: util.DUDEParameters,
+                          checkpoints: util.CheckpointWriter) -> List[str]:
     """
     Filter out urls with generated prefixes in their urls.
     :param domain: domain to identify orphan pages for
+    :param candidates: parsed orphan candidates
     :param dude_params: parameters for the dude step
-    :return: amount of remaining candidates
+    :param checkpoints: writer for the interim result files
+    :return: sorted list of remaining candidates
     """
     candidates_path = constants.CANDIDATES_TO_PROBE_LIST_NAME_TEMPLATE.format(DOMAIN=domain)
-    candidates = util.read_lines_from_file(candidates_path)
 
-    # start dude process
-    orphan_candidates, excluded_candidates, identified_prefixes = dude_main(candidates, domain, dude_params)
+    # start dude process with the prefixes of previous runs
+    dude_model = {} if dude_params.full_recompute else load_dude_model(domain, dude_params)
+    orphan_candidates, excluded_candidates, subdomain_prefixes = dude_main(candidates, dude_params, dude_model)
+    save_dude_model(domain, dude_params, subdomain_prefixes)
 
     orphan_candidates.sort()
     excluded_candidates.sort()
-    identified_prefixes.sort()
+    identified_prefixes = sorted(prefix for prefixes in subdomain_prefixes.values() for prefix in prefixes)
 
     # output results
     excluded_path = constants.DUDE_EXCLUDED_LIST_NAME_TEMPLATE.format(DOMAIN=domain)
     prefixes_path = constants.DUDE_EXCLUDED_PREFIXES_NAME_TEMPLATE.format(DOMAIN=domain)
 
-    util.write_lines_to_file(candidates_path, orphan_candidates)
-    util.write_lines_to_file(excluded_path, excluded_candidates)
-    util.write_lines_to_file(prefixes_path, identified_prefixes)
+    checkpoints.write(candidates_path, orphan_candidates)
+    checkpoints.write(excluded_path, excluded_candidates)
+    checkpoints.write(prefixes_path, identified_prefixes)
 
-    return len(orphan_candidates)
+    return orphan_candidates
 
 
-def remove_schema(url_list: List[str]) -> Tuple[set[str], dict[str, list[str]]]:
-    """
-    Cutoff HTTP & HTTPS schemas and provide back transformation lookup
-    :param url_list: list of all urls with schemes
-    :return: tuple of set of urls without schemes and back transformation lookup
-    """
-    back_transformation_lookup = {}
-    cleaned_urls = set()
-    for url in url_list:
-        # identify sschema
-        if url.startswith(HTTPS_SCHEMA):
-            schema = HTTPS_SCHEMA
-            short_url = url[len(HTTPS_SCHEMA):]
-        elif url.startswith(HTTP_SCHEMA):
-            schema = HTTP_SCHEMA
-            short_url = url[len(HTTP_SCHEMA):]
-        else:
-            schema = ""
-            short_url = url
-        # store url without schema
-        cleaned_urls.add(short_url)
-
-        # store schema for back transformation
-        if short_url in back_transformation_lookup:
-            back_transformation_lookup[short_url].append(schema)
-        else:
-            back_transformation_lookup[short_url] = [schema]
-    return cleaned_urls, back_transformation_lookup
+def get_filtered_hosts(candidates: util.ParsedUrls, dude_params: util.DUDEParameters) -> FrozenSet[str]:
+    """Returns the hosts with enough candidates to be filtered by DUDe, the candidates of all other hosts are kept
+    without filtering."""
+    host_counts = Counter(util.get_host(candidates, index) for index in range(len(candidates.urls)))
+    return frozenset(host for host, amount in host_counts.items() if amount >= dude_params.subdomain_threshold)
+
+
+def get_model_parameters(dude_params: util.DUDEParameters) -> Dict[str, float | int]:
+    """Returns all dude parameters which influence the identified prefixes."""
+    return {"popularity_cutoff": dude_params.popularity_cutoff,
+            "short_prefix_cutoff": dude_params.short_prefix_cutoff,
+            "large_link_len_threshold": dude_params.large_link_len_threshold,
+            "large_link_count": dude_params.large_link_count,
+            "subdomain_threshold": dude_params.subdomain_threshold}
 
 
-def transform_short_urls_back(url_list: List[str], transformation_lookup: Dict[str, List[str]]) -> List[str]:
+def load_dude_model(domain: str, dude_params: util.DUDEParameters) -> DudeModel:
+    """
+    Load the prefixes identified in a previous run for every subdomain.
+    :param domain: domain to identify orphan pages for
+    :param dude_params: parameters for the dude step
+    :return: mapping of subdomains to their prefixes, empty if no model with the same parameters exists
+    """
+    model_path = constants.DUDE_MODEL_NAME_TEMPLATE.format(DOMAIN=domain)
+    if not util.is_file(model_path):
+        return {}
+    dude_model = util.read_from_json_file(model_path)
+    if dude_model.get("parameters") != get_model_parameters(dude_params):
+        print("Ignoring saved DUDe prefixes of a previous run with different parameters.")
+        return {}
+    return dude_model.get("prefixes", {})
+
+
+def save_dude_model(domain: str, dude_params: util.DUDEParameters, subdomain_prefixes: DudeModel) -> None:
+    """Saves the identified prefixes for every subdomain together with the parameters of the dude step."""
+    model_path = constants.DUDE_MODEL_NAME_TEMPLATE.format(DOMAIN=domain)
+    util.save_to_json_file(model_path, {"parameters": get_model_parameters(dude_params),
+                                        "prefixes": {subdomain: sorted(prefixes)
+                                                     for subdomain, prefixes in subdomain_prefixes.items()
+                                                     if prefixes}})
+
+
+def get_schema_length(url: str) -> int:
+    """Returns the length of the HTTP or HTTPS schema of given url, 0 for urls without one of them."""
+    if url.startswith(HTTPS_SCHEMA):
+        return len(HTTPS_SCHEMA)
+    if url.startswith(HTTP_SCHEMA):
+        return len(HTTP_SCHEMA)
+    return 0
+
+
+def remove_schema(parsed_urls: util.ParsedUrls) -> CandidateStore:
+    """
+    Cutoff HTTP & HTTPS schemas and provide back transformation lookup. The urls are not copied,
+    only the length of their schemas is stored.
+    :param parsed_urls: parsed urls with schemes
+    :return: store of the urls with the length of their schemas and their ids
     """
-    Transform cleaned urls back through adding their schemes again.
-    :param url_list: list of cleaned urls
-    :param transformation_lookup: back transformation lookup with mapping of cleaned urls to schemes
+    url_list = parsed_urls.urls
+    schema_lengths = np.fromiter((get_schema_length(url) for url in url_list), dtype=np.uint8, count=len(url_list))
+    url_ids = np.arange(len(url_list), dtype=np.int64)
+
+    # urls without schema with the same hash are compared directly, equal ones get the id of the first of them
+    url_hashes = np.fromiter((hash(url[schema_length:]) for url, schema_length
+                              in zip(url_list, schema_lengths.tolist())), dtype=np.int64, count=len(url_list))
+    hash_order = np.argsort(url_hashes, kind="stable")
+    sorted_hashes = url_hashes[hash_order]
+    del url_hashes
+    repeated_hashes = np.unique(sorted_hashes[1:][sorted_hashes[1:] == sorted_hashes[:-1]])
+    group_starts = np.searchsorted(sorted_hashes, repeated_hashes, side="left").tolist()
+    group_ends = np.searchsorted(sorted_hashes, repeated_hashes, side="right").tolist()
+    for group_start, group_end in zip(group_starts, group_ends):
+        url_lookup = {}
+        for position in hash_order[group_start:group_end].tolist():
+            url_ids[position] = url_lookup.setdefault(url_list[position][schema_lengths[position]:], position)
+    return CandidateStore(urls=url_list, schema_lengths=schema_lengths,
+                          host_ends=util.get_host_ends(parsed_urls), url_ids=url_ids)
+
+
+def transform_short_urls_back(short_url_ids: np.ndarray, store: CandidateStore) -> List[str]:
+    """
+    Transform cleaned urls back to all urls with schemes they were created from.
+    :param short_url_ids: ids of the cleaned urls
+    :param store: store of the urls with schemes
     :return: list of back transformed urls
     """
-    transformed_list = []
-    for short_url in url_list:
-        for schema in transformation_lookup[short_url]:
-            transformed_list.append(f"{schema}{short_url}")
-    return transformed_list
+    is_selected = np.zeros(len(store.urls), dtype=bool)
+    is_selected[short_url_ids] = True
+    return [url for url, selected in zip(store.urls, is_selected[store.url_ids].tolist()) if selected]
 
 
-def identify_subdomains(url_list: List[str], domain: str) -> Dict[str, List[str]]:
+def identify_subdomains(store: CandidateStore) -> Dict[str, np.ndarray]:
     """
-    Identify all subdomains in the candidate urls and group the urls together by their subdomain.
-    :param url_list: list with all urls
-    :param domain: domain to identify orphan pages for
-    :return: mapping of subdomains to their urls
+    Identify all subdomains in the candidate urls by their parsed hosts and group the urls together by their subdomain.
+    The subdomain of an url is its beginning without schema until the end of its host.
+    :param store: store of the urls with schemes
+    :return: mapping of subdomains to the ids of their urls
     """
     domain_lookup = {}
-    for url in url_list:
-        index_domain_begin = url.find(domain)
-        sub_domain = url[:index_domain_begin + len(domain)]
+    unique_url_ids = np.flatnonzero(store.url_ids == np.arange(len(store.urls)))
+    for url_id, schema_length, host_end in zip(unique_url_ids.tolist(), store.schema_lengths[unique_url_ids].tolist(),
+                                               store.host_ends[unique_url_ids].tolist()):
+        sub_domain = store.urls[url_id][schema_length:host_end]
         if sub_domain in domain_lookup:
-            domain_lookup[sub_domain].append(url)
+            domain_lookup[sub_domain].append(url_id)
         else:
-            domain_lookup[sub_domain] = [url]
-    return domain_lookup
+            domain_lookup[sub_domain] = array('q', [url_id])
+    return {sub_domain: np.frombuffer(url_ids, dtype=np.int64) for sub_domain, url_ids in domain_lookup.items()}
 
 
-def dude_main(url_list: List[str], domain: str, dude_params: util.DUDEParameters) -> DudeReturnType:
+def dude_main(parsed_urls: util.ParsedUrls, dude_params: util.DUDEParameters,
+              dude_model: DudeModel | None = None) -> DudeMainReturnType:
     """
     Transform urls, execute DUDe per subdomain and back transform results.
-    :param url_list: list with candidate urls
-    :param domain: domain to identify orphan pages for
+    :param parsed_urls: parsed candidate urls
     :param dude_params: parameters for dude process
-    :return: tuple of candidate list, excluded urls list and list of identified prefixes
+    :param dude_model: mapping of subdomains to prefixes of a previous run, applied before DUDe
+    :return: tuple of candidate list, excluded urls list and mapping of subdomains to their identified prefixes
     """
     # clen urls and identify subdomains
-    url_list, back_transformation_lookup = remove_schema(url_list)
-    subdomain_lookup = identify_subdomains(list(url_list), domain)
-    orphans, excluded, prefixes = [], [], []
+    store = remove_schema(parsed_urls)
+    subdomain_lookup = identify_subdomains(store)
+    subdomain_results = execute_dude_on_subdomains(subdomain_lookup, store, dude_params, dude_model or {})
 
-    for subdomain, subdomain_urls in subdomain_lookup.items():
-        if len(subdomain_urls) < dude_params.subdomain_threshold:  # skip subdomains with very small amount of urls
-            orphans += subdomain_urls
-            continue
-
-        pc_cutoff_value = len(subdomain_urls) * dude_params.popularity_cutoff
-        orphans_subdomain, excluded_subdomain, prefixes_subdomain =\
-            dude_subdomain(set(subdomain_urls), subdomain, dude_params, pc_cutoff_value)
-
-        orphans += orphans_subdomain
-        excluded += excluded_subdomain
-        prefixes += prefixes_subdomain
+    # merge results in a fixed order of the subdomains
+    orphans, excluded, prefixes = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)], {}
+    for subdomain in sorted(subdomain_results):
+        orphans_subdomain, excluded_subdomain, prefixes[subdomain] = subdomain_results.pop(subdomain)
+        orphans.append(orphans_subdomain)
+        excluded.append(excluded_subdomain)
 
     # transform cleaned urls back
-    orphans_with_schema = transform_short_urls_back(orphans, back_transformation_lookup)
-    excluded_with_schema = transform_short_urls_back(excluded, back_transformation_lookup)
+    orphans_with_schema = transform_short_urls_back(np.concatenate(orphans), store)
+    excluded_with_schema = transform_short_urls_back(np.concatenate(excluded), store)
     return orphans_with_schema, excluded_with_schema, prefixes
 
 
-def dude_subdomain(url_list: Set[str], domain: str, dude_params: util.DUDEParameters,
-                   cutoff_value: float, prev_prefix: str = "") -> DudeReturnType:
+def execute_dude_on_subdomains(subdomain_lookup: Dict[str, np.ndarray], store: CandidateStore,
+                               dude_params: util.DUDEParameters, dude_model: DudeModel) -> Dict[str, DudeReturnType]:
+    """
+    Execute DUDe for every subdomain, large subdomains are sent to a process pool (biggest first),
+    all other ones are processed inline meanwhile.
+    :param subdomain_lookup: mapping of subdomains to the ids of their urls
+    :param store: store of the urls with schemes
+    :param dude_params: parameters for dude process
+    :param dude_model: mapping of subdomains to prefixes of a previous run
+    :return: mapping of subdomains to their tuple of candidate ids, excluded ids and list of identified prefixes
+    """
+    parallel_subdomains = sorted((subdomain for subdomain, subdomain_urls in subdomain_lookup.items()
+                                  if len(subdomain_urls) >= max(dude_params.subdomain_threshold,
+                                                                constants.DUDE_PARALLEL_MIN_SUBDOMAIN_SIZE)),
+                                 key=lambda subdomain: (-len(subdomain_lookup[subdomain]), subdomain))
+    workers = min(dude_params.workers, len(parallel_subdomains), os.cpu_count() or 1)
+    if workers <= 1:
+        parallel_subdomains = []
+
+    subdomain_results = {}
+    with ProcessPoolExecutor(max_workers=max(workers, 1)) as executor:
+        futures = {subdomain: executor.submit(dude_single_subdomain,
+                                              *select_subdomain_urls(store, subdomain_lookup[subdomain]),
+                                              subdomain, dude_params, dude_model.get(subdomain, []))
+                   for subdomain in parallel_subdomains}
+
+        for subdomain, url_ids in subdomain_lookup.items():
+            if subdomain in futures:
+                continue
+            if len(url_ids) < dude_params.subdomain_threshold:  # skip subdomains with very small amount of urls
+                subdomain_results[subdomain] = url_ids, np.empty(0, dtype=np.int64), []
+                continue
+            orphans, excluded, prefixes = dude_single_subdomain(*select_subdomain_urls(store, url_ids), subdomain,
+                                                                dude_params, dude_model.get(subdomain, []))
+            subdomain_results[subdomain] = url_ids[orphans], url_ids[excluded], prefixes
+
+        # results of the process pool are positions in the url list of the subdomain
+        for subdomain, future in futures.items():
+            orphans, excluded, prefixes = future.result()
+            url_ids = subdomain_lookup[subdomain]
+            subdomain_results[subdomain] = url_ids[orphans], url_ids[excluded], prefixes
+    return subdomain_results
+
+
+def select_subdomain_urls(store: CandidateStore, url_ids: np.ndarray) -> Tuple[List[str], List[int]]:
+    """Returns the urls with the given ids and the lengths of their schemas."""
+    return [store.urls[url_id] for url_id in url_ids.tolist()], store.schema_lengths[url_ids].tolist()
+
+
+def dude_single_subdomain(subdomain_urls: List[str], schema_lengths: List[int], subdomain: str,
+                          dude_params: util.DUDEParameters, known_prefixes: List[str]) -> DudeReturnType:
+    """
+    Build the prefix index for a single subdomain, exclude all urls matching the prefixes of a previous run
+    and execute DUDe on the remaining urls.
+    :param subdomain_urls: list with all urls of the subdomain
+    :param schema_lengths: length of the schema of every url of the subdomain
+    :param subdomain: subdomain of the urls
+    :param dude_params: parameters for dude process
+    :param known_prefixes: prefixes identified for the subdomain in a previous run
+    :return: tuple of candidate positions, excluded positions (in the list of urls) and list of identified prefixes
+    """
+    pc_cutoff_value = len(subdomain_urls) * dude_params.popularity_cutoff
+    prefix_index = DudePrefixIndex(subdomain_urls, schema_lengths, subdomain)
+    candidates = prefix_index.root_scope
+
+    # prefilter with known prefixes (most specific ones first), prefixes without any matching url are dropped
+    excluded, applied_prefixes = [], []
+    for prefix in sorted(known_prefixes, key=lambda known_prefix: (-len(known_prefix), known_prefix)):
+        c_with_prefix = prefix_index.match(candidates, prefix)
+        if prefix_index.count(c_with_prefix) == 0:
+            continue
+        applied_prefixes.append(prefix)
+        excluded.append(prefix_index.get_rows(c_with_prefix))
+        candidates = prefix_index.remove(candidates, c_with_prefix)
+
+    orphans, excluded_dude, prefixes_dude = dude_subdomain(prefix_index, candidates, subdomain, dude_params,
+                                                           pc_cutoff_value)
+    return orphans, np.concatenate([*excluded, excluded_dude]), applied_prefixes + prefixes_dude
+
+
+def dude_subdomain(prefix_index: DudePrefixIndex, candidates: CandidateScope, domain: str,
+                   dude_params: util.DUDEParameters, cutoff_value: float, prev_prefix: str = "") -> DudeReturnType:
     """
     Execute DUDe.
-    :param url_list: list with urls for subdomain
+    :param prefix_index: prefix index over all urls of the subdomain
+    :param candidates: scope of the candidates in the prefix index
     :param domain: domain to identify orphan pages for
     :param dude_params: parameters for dude step
     :param cutoff_value: popularity cutoff value for subdomain
     :param prev_prefix: prefix of previous iteration
-    :return: tuple of candidate list, excluded urls list and list of identified prefixes
+    :return: tuple of candidate positions, excluded positions (in the list of urls) and list of identified prefixes
     """
-    orphans = []
-    excluded = []
+    orphans = [np.empty(0, dtype=np.int64)]
+    excluded = [np.empty(0, dtype=np.int64)]
     identified_prefixes = []
-    candidates = url_list
 
     while True:
-        if len(candidates) < cutoff_value:  # too less candidates to fulfill pc condition
-            orphans += list(candidates)
+        if prefix_index.count(candidates) < cutoff_value:  # too less candidates to fulfill pc condition
+            orphans.append(prefix_index.get_rows(candidates))
             break
 
         # find prefix
-        prefix, c_with_prefix, c_without_prefix = execute_dude_step(candidates, len(domain), cutoff_value,
-                                                                    dude_params.large_link_len_threshold,
-                                                                    dude_params.large_link_count)
+        prefix, c_with_prefix = execute_dude_step(prefix_index, candidates, len(domain), cutoff_value,
+                                                  dude_params.large_link_len_threshold, dude_params.large_link_count)
 
         if prefix is None or prefix == prev_prefix:  # stop if new prefix equals prev prefix or no prefix can be found
-            orphans += list(candidates)
+            orphans.append(prefix_index.get_rows(candidates))
             break
 
         if len(prefix) < len(domain) + dude_params.short_prefix_cutoff:
             # in case of to short prefix repeat dude on urls matching the short prefix
-            orp_part, exc_part, prefixes_part = dude_subdomain(c_with_prefix, domain, dude_params, cutoff_value, prefix)
+            orp_part, exc_part, prefixes_part = dude_subdomain(prefix_index, c_with_prefix, domain, dude_params,
+                                                               cutoff_value, prefix)
 
-            orphans += orp_part
-            excluded += exc_part
+            orphans.append(orp_part)
+            excluded.append(exc_part)
             identified_prefixes += prefixes_part
-            # continue with dude on urls not matching the short prefix
-            candidates = c_without_prefix
 
         else:
             # remove urls matching the prefix
             identified_prefixes.append(prefix)
-            excluded += list(c_with_prefix)
+            excluded.append(prefix_index.get_rows(c_with_prefix))
 
-            # continue with dude on urls not matching the short prefix
-            candidates = c_without_prefix
+        # continue with dude on urls not matching the prefix
+        candidates = prefix_index.remove(candidates, c_with_prefix)
 
-    return orphans, excluded, identified_prefixes
+    return np.concatenate(orphans), np.concatenate(excluded), identified_prefixes
 
 
-def execute_dude_step(url_list: Set[str], domain_len: int, popularity_cutoff: float,
-                      large_link_len_threshold: int, large_link_count: int) -> Tuple[str | None, Set[str], Set[str]]:
+def execute_dude_step(prefix_index: DudePrefixIndex, candidates: CandidateScope, domain_len: int,
+                      popularity_cutoff: float, large_link_len_threshold: int,
+                      large_link_count: int) -> Tuple[str | None, CandidateScope | None]:
     """
     Execute one dude step to identify one prefix and the urls matching it.
-    :param url_list: list of candidate urls
+    :param prefix_index: prefix index over all urls of the subdomain
+    :param candidates: scope of the candidates in the prefix index
     :param domain_len: len of base domain
     :param popularity_cutoff: popularity cutoff value
     :param large_link_len_threshold: large_link_len_threshold
     :param large_link_count: large_link_count
-    :return: Tuple of prefix, list with candidates matching the prefix and list with candidates not matching the prefix
+    :return: Tuple of prefix and scope of the candidates matching the prefix, None for both if no prefix is found
     """
-    # filter large links
-    large_urls = [url for url in url_list if len(url) > large_link_len_threshold + domain_len]
-    if len(large_urls) <= large_link_count:
-        return None, url_list, set()
-
-    avg_len, max_len = get_average_and_max_len(url_list)
-    counters = count_characters_per_position(large_urls, max_len)
-    prefix = generate_prefix(counters, avg_len)
-    return shorten_prefix(prefix, url_list, popularity_cutoff)
-
-
-def get_average_and_max_len(url_list: Set[str]) -> Tuple[int, int]:
-    """
-    Calculate average and max length of all urls.
-    :param url_list: list with all urls
-    :return:  average len, max len
-    """
-    url_lengths = [len(url) for url in url_list]
-    avg_len = sum(url_lengths) // len(url_list)
-    max_len = max(url_lengths)
-    return avg_len, max_len
-
-
-def count_characters_per_position(url_list: List[str], max_len: int) -> List[Dict[str, int]]:
-    """
-    Count characters at each position for all urls.
-    :param url_list: list with all urls
-    :param max_len: len of the longest url
-    :return: all character counters for each position in the urls
-    """
-    counters = [{} for _ in range(max_len)]
-    for url in url_list:
-        for position, character in enumerate(url):
-            if character in counters[position]:
-                counters[position][character] += 1
-            else:
-                counters[position][character] = 1
-    return counters
+    char_matrix = prefix_index.char_matrix
+    rows = prefix_index.get_rows(candidates)
+    url_lengths = char_matrix.lengths[rows]
 
+    # filter large links
+    large_rows = rows[url_lengths > large_link_len_threshold + domain_len]
+    if len(large_rows) <= large_link_count:
+        return None, None
 
-def generate_prefix(counters: List[Dict[str, int]], avg_len: int) -> str:
-    """
-    Generate the prefix from most occurring characters for each position.
-    :param counters: all character counters for each position in the urls
-    :param avg_len: average len of all urls
-    :return: generated prefix
-    """
-    generated_prefix = ""
-    for i in range(0, avg_len):
-        generated_prefix += max(counters[i], key=counters[i].get)
-    return generated_prefix
+    avg_len = int(url_lengths.sum()) // len(rows)
+    prefix = generate_prefix(char_matrix, large_rows, avg_len)
+    return shorten_prefix(prefix, prefix_index, candidates, popularity_cutoff)
 
 
-def shorten_prefix(prefix: str, url_list: Set[str], pc_cutoff_value: float) -> Tuple[str, Set[str], Set[str]]:
+def shorten_prefix(prefix: str, prefix_index: DudePrefixIndex, candidates: CandidateScope,
+                   pc_cutoff_value: float) -> Tuple[str, CandidateScope]:
     """
     Shorten generated prefix until enough urls are matching the prefix
     :param prefix: generated prefix
-    :param url_list: list with all urls
+    :param prefix_index: prefix index over all urls of the subdomain
+    :param candidates: scope of the candidates in the prefix index
     :param pc_cutoff_value: popularity cutoff value
-    :return: Tuple of prefix, list with candidates matching the prefix and list with candidates not matching the prefix
+    :return: Tuple of prefix and scope of the candidates matching the prefix
     """
+    amount_candidates = prefix_index.count(candidates)
     while True:
-        candidates_with_prefix = {url for url in url_list if prefix in url}
-        candidates_without_prefix = url_list - candidates_with_prefix
+        candidates_with_prefix = prefix_index.match(candidates, prefix)
+        amount_with_prefix = prefix_index.count(candidates_with_prefix)
 
-        if len(candidates_with_prefix) >= pc_cutoff_value or len(candidates_with_prefix) == len(url_list):
-            return prefix, candidates_with_prefix, candidates_without_prefix
+        if amount_with_prefix >= pc_cutoff_value or amount_with_prefix == amount_candidates:
+            return prefix, candidates_with_prefix
         prefix = prefix[:-1]
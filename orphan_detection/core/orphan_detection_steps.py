@@ -1,13 +1,16 @@
 """This file contains all function steps to detect orphan pages for a single domain
 except the ones for the dynamic url detection step"""
 import datetime
-import time
+from typing import Dict, FrozenSet, Iterator, List, Tuple
 
 from tqdm import tqdm
 
 from orphan_detection import constants
 from orphan_detection import util
 
+from orphan_detection.core.archive_retrieval import download_time_sliced, download_refresh, find_latest_archive_file
+from orphan_detection.core.dynamic_url_detection import get_filtered_hosts
+
 
 def initialize_data_directory(domain: str) -> None:
     """Create all output directories"""
@@ -23,129 +26,261 @@ def initialize_data_directory(domain: str) -> None:
     util.create_directory(constants.DOMAIN_TMP_DIRECTORY.format(DOMAIN=domain))
 
 
-def download_web_archive_data(searched_domain: str) -> str:
-    """Download the web archive data for given domain"""
-    # retrieve data from web archiv
-    response = util.download_page_content(constants.WEB_ARCHIV_BASE_URL.format(DOMAIN=searched_domain),
-                                          bytes_content=False)
-    if response.error_msg is not None:
-        print(f"Failed to download Data from Webarchive for domain {searched_domain}.")
-        return ""
-
-    # zip results and save in archive directory
-    date = util.get_date()
+def download_web_archive_data(searched_domain: str, download_params: util.ArchiveDownloadParameters,
+                              date: str | None = None) -> str:
+    """
+    Download the web archive data for given domain and stream it directly into the zipped archive file.
+    :param searched_domain: domain to download the web archive data for
+    :param download_params: parameters for the download process
+    :param date: download date to save the data for, None for the current date
+    :return: path to the zipped archive file, empty string if the download failed
+    """
+    date = util.get_date() if date is None else date
     zipped_archive_file = constants.ZIPPED_ARCHIVE_NAME_TEMPLATE.format(DOMAIN=searched_domain, DATE=date)
-
-    response_data = response.content.splitlines()
-    util.write_lines_to_file(zipped_archive_file, response_data, zipped_file=True)
+    query_url = download_params.cdx_url + constants.WEB_ARCHIV_QUERY.format(DOMAIN=searched_domain)
+
+    previous_archive_file = find_latest_archive_file(searched_domain) if download_params.refresh else None
+    if download_params.refresh and previous_archive_file is None:
+        print(f"No previous web archive data found for {searched_domain}, downloading the complete data.")
+
+    # retrieve data from web archiv and save it zipped in archive directory
+    if previous_archive_file is not None:
+        error_msg = download_refresh(searched_domain, query_url, previous_archive_file, zipped_archive_file)
+    elif download_params.slice_years > 0:
+        error_msg = download_time_sliced(searched_domain, query_url, zipped_archive_file, download_params)
+    else:
+        error_msg = util.download_to_gzip_file(query_url, zipped_archive_file)
+
+    if error_msg is not None:
+        print(f"Failed to download Data from Webarchive for domain {searched_domain}: {error_msg}.")
+        return ""
     return zipped_archive_file
 
 
-def get_orphan_candidates(zipped_archive_file: str, current_sitemap_filter: datetime.date, domain: str) -> int:
+def get_orphan_candidates(zipped_archive_file: str, current_sitemap_filter: datetime.date, domain: str,
+                          extraction_params: util.ExtractionParameters,
+                          checkpoints: util.CheckpointWriter) -> List[str] | util.FileBackedList:
     """
     Identify potential orphans not being part of the sitemap after the current_sitemap_filter date.
+    The url index (or the columnar cache) of the archive data is built on first use
+    and queried afterwards instead of rescanning the archive. With a memory budget the urls are sorted
+    and deduplicated in runs on disk instead, the candidates are written to their tmp result file
+    and read from there by the next step.
     :param zipped_archive_file: path to the file with the web archive data
     :param current_sitemap_filter: date to separate orphan candidates from pages being part of the current sitemap
     :param domain: domain to identify orphan pages for
-    :return: amount of orphan candidates
+    :param extraction_params: parameters for the extraction
+    :param checkpoints: writer for the interim result files
+    :return: sorted list of orphan candidates, backed by their tmp result file with a memory budget
     """
-    url_list_web_archive = util.read_lines_from_file(zipped_archive_file, zipped_file=True)
-
-    current_unique_url_set = set()
-    total_unique_url_set = set()
+    # timestamps are compared in the web archive format YYYYMMDDhhmmss
+    current_sitemap_key = int(current_sitemap_filter.strftime('%Y%m%d') + "000000")
 
-    for web_archive_line in url_list_web_archive:
-        # separate line into timestamp and url
-        timestamp, url = web_archive_line.split(" ")[:2]
-        timestamp_date = datetime.datetime.strptime(timestamp, '%Y%m%d%H%M%S').date()
-
-        # add urls with an index date after the current sitemap filter date to the current urls set
-        if timestamp_date >= current_sitemap_filter:
-            current_unique_url_set.add(url)
-
-        total_unique_url_set.add(url)
-
-    # identify missing urls
-    orphan_candidates_url_set = total_unique_url_set - current_unique_url_set
-
-    # sort entries
-    current_unique_url_sorted = list(current_unique_url_set)
-    total_unique_url_sorted = list(total_unique_url_set)
-    orphan_candidates_url_sorted = list(orphan_candidates_url_set)
+    orphan_candidates_file_path = constants.CANDIDATES_LIST_NAME_TEMPLATE.format(DOMAIN=domain)
 
-    current_unique_url_sorted.sort()
-    total_unique_url_sorted.sort()
-    orphan_candidates_url_sorted.sort()
+    # select sorted urls, urls last seen before the current sitemap filter date are the candidates
+    run_directory = constants.SORT_RUNS_DIRECTORY.format(DOMAIN=domain)
+    if extraction_params.memory_budget > 0:
+        merged_run, amount_candidates = util.external_sort_archive_urls(
+            zipped_archive_file, current_sitemap_key, run_directory, extraction_params.memory_budget * 1024 * 1024)
+        current_unique_urls = (url for url, is_current in util.iterate_flagged_urls(merged_run) if is_current)
+        total_unique_urls = (url for url, _ in util.iterate_flagged_urls(merged_run))
+        util.write_lines_to_file(orphan_candidates_file_path, (url for url, is_current
+                                                               in util.iterate_flagged_urls(merged_run)
+                                                               if not is_current))
+        orphan_candidates = util.FileBackedList(orphan_candidates_file_path, amount_candidates)
+    elif extraction_params.columnar_cache:
+        columns_directory = util.get_archive_columns(zipped_archive_file)
+        current_url_ids, candidate_url_ids = util.select_current_url_ids(columns_directory, current_sitemap_key)
+        current_unique_urls = util.iterate_column_urls(columns_directory, current_url_ids)
+        total_unique_urls = util.iterate_column_urls(columns_directory)
+        orphan_candidates = list(util.iterate_column_urls(columns_directory, candidate_url_ids))
+    else:
+        index_file = util.get_archive_index(zipped_archive_file)
+        current_unique_urls = util.query_indexed_urls(index_file, last_seen_from=current_sitemap_key)
+        total_unique_urls = util.query_indexed_urls(index_file)
+        orphan_candidates = list(util.query_indexed_urls(index_file, last_seen_before=current_sitemap_key))
 
     # save as tmp results
     current_file_path = constants.CURRENT_UNIQUE_URL_NAME_TEMPLATE.format(DOMAIN=domain, FILTER=current_sitemap_filter)
     total_file_path = constants.TOTAL_UNIQUE_URL_NAME_TEMPLATE.format(DOMAIN=domain)
-    orphan_candidates_file_path = constants.CANDIDATES_LIST_NAME_TEMPLATE.format(DOMAIN=domain)
 
-    util.write_lines_to_file(current_file_path, current_unique_url_sorted)
-    util.write_lines_to_file(total_file_path, total_unique_url_sorted)
-    util.write_lines_to_file(orphan_candidates_file_path, orphan_candidates_url_sorted)
-    return len(orphan_candidates_url_set)
+    checkpoints.write(current_file_path, current_unique_urls)
+    checkpoints.write(total_file_path, total_unique_urls)
 
+    # the sorted runs are read by the checkpoints, so they have to be finished before the runs are removed
+    if extraction_params.memory_budget > 0:
+        checkpoints.wait()
+        util.delete_directory(run_directory)
+    else:
+        checkpoints.write(orphan_candidates_file_path, orphan_candidates)
+    return orphan_candidates
 
-def filter_file_extensions(domain: str) -> int:
+
+def filter_file_extensions(domain: str, candidates_unfiltered: List[str] | util.FileBackedList,
+                           filter_params: util.FilterParameters, checkpoints: util.CheckpointWriter) -> util.ParsedUrls:
     """
-    Filter out all candidate urls identified as leading to a ressource file.
+    Parse all candidate urls once and filter out all urls identified as leading to a ressource file
+    by the file extension of their path. Candidates backed by a file are filtered while they are read,
+    so only the remaining candidates are kept in memory.
     :param domain: domain to identify orphan pages for
-    :return: amount of remaining candidates
+    :param candidates_unfiltered: list of orphan candidates
+    :param filter_params: parameters for the filter
+    :param checkpoints: writer for the interim result files
+    :return: parsed remaining candidates
     """
-    orphan_candidates_file_path = constants.CANDIDATES_LIST_NAME_TEMPLATE.format(DOMAIN=domain)
-    candidates_unfiltered = util.read_lines_from_file(orphan_candidates_file_path)
-
-    candidates_filtered = []
-    for url in candidates_unfiltered:
-        if not util.is_resource_url(url):
-            candidates_filtered.append(url)
+    if isinstance(candidates_unfiltered, util.FileBackedList):
+        candidates_unfiltered = [url for url in candidates_unfiltered
+                                 if not util.is_resource_url(url, filter_params.extensions)]
+    parsed_candidates = util.parse_urls(candidates_unfiltered, filter_params.workers)
+    candidates_filtered = util.filter_resource_urls(parsed_candidates, filter_params.extensions)
 
     candidates_filtered_file_path = constants.CANDIDATES_FILTERED_LIST_NAME_TEMPLATE.format(DOMAIN=domain)
-    util.write_lines_to_file(candidates_filtered_file_path, candidates_filtered)
+    checkpoints.write(candidates_filtered_file_path, candidates_filtered.urls)
 
     candidates_to_probe_path = constants.CANDIDATES_TO_PROBE_LIST_NAME_TEMPLATE.format(DOMAIN=domain)
-    util.write_lines_to_file(candidates_to_probe_path, candidates_filtered)
-    return len(candidates_filtered)
+    checkpoints.write(candidates_to_probe_path, candidates_filtered.urls)
+    return candidates_filtered
+
+
+def canonicalize_candidates(domain: str, candidates: List[str],
+                            canonical_rules: FrozenSet[str]) -> Tuple[List[str], Dict[str, List[str]]]:
+    """
+    Group all candidates leading to the same page by their canonical form, only one representative of every group
+    is probed. The groups with more than one candidate are saved as tmp results.
+    :param domain: domain to identify orphan pages for
+    :param candidates: list of candidates to probe
+    :param canonical_rules: set of rules to canonicalize the candidates with
+    :return: list of representatives in the order of the candidates and mapping of representatives to all
+             candidates of their group, for groups with more than one candidate only
+    """
+    if not canonical_rules:
+        return candidates, {}
+    candidate_groups = util.group_equivalent_urls(candidates, canonical_rules)
+    equivalent_urls = {representative: members for representative, members in candidate_groups.items()
+                       if len(members) > 1}
 
+    canonical_groups_file_path = constants.CANONICAL_GROUPS_NAME_TEMPLATE.format(DOMAIN=domain)
+    util.write_lines_to_file(canonical_groups_file_path, [" ".join(members) for members in equivalent_urls.values()])
+    return list(candidate_groups), equivalent_urls
 
-def check_status_codes(domain: str, probe_args: util.ProbeParameters) -> int:
+
+def prioritize_candidates(archive_data_file: str, parsed_candidates: util.ParsedUrls, probe_candidates: List[str],
+                          dude_params: util.DUDEParameters | None) -> List[str]:
+    """
+    Order the candidates by cheap signals, so the most valuable candidates are probed first within the probe budget:
+    candidates last captured in a more recent year (from the url index, or a single pass over the web archive data
+    if the index was not built for the candidate extraction), candidates of hosts
+    filtered by DUDe and candidates with a shallow path come first.
+    :param archive_data_file: path to the file with the web archive data
+    :param parsed_candidates: parsed candidates of the file extension filter step
+    :param probe_candidates: list of candidates to probe, all part of the parsed candidates
+    :param dude_params: parameters for the DUDe step, None if DUDe is disabled
+    :return: list of candidates in their probe order
+    """
+    index_file = constants.ARCHIVE_INDEX_NAME_TEMPLATE.format(ARCHIVE_FILE=archive_data_file)
+    if util.is_file(index_file):
+        last_seen_dates = util.query_last_seen_dates(index_file, probe_candidates)
+    else:
+        last_seen_dates = util.scan_last_seen_dates(archive_data_file, probe_candidates)
+    dude_hosts = frozenset() if dude_params is None else get_filtered_hosts(parsed_candidates, dude_params)
+    candidates = set(probe_candidates)
+
+    priorities = []
+    for index, url in enumerate(parsed_candidates.urls):
+        if url not in candidates:  # removed by DUDe
+            continue
+        last_seen_year = last_seen_dates.get(url, 0) // 10 ** 10  # timestamps in the format YYYYMMDDhhmmss
+        path_segments = util.get_path(parsed_candidates, index).strip("/")
+        path_depth = path_segments.count("/") + 1 if path_segments else 0
+        priorities.append((-last_seen_year, util.get_host(parsed_candidates, index) not in dude_hosts, path_depth, url))
+    return [url for *_, url in sorted(priorities)]
+
+
+def iterate_probe_results(domain: str, probe_candidates: List[str],
+                          probe_args: util.ProbeParameters) -> Iterator[Tuple[str, int, str | None]]:
+    """
+    Returns the probe results of all candidates. Valid cached results and results of an interrupted run are reused,
+    all other candidates are probed and their results are recorded in the cache and the journal.
+    The effective request rate of every probed host is reported at the end.
+    :param domain: domain to identify orphan pages for
+    :param probe_candidates: list of candidates to probe in their probe order
+    :param probe_args: parameters for probe
+    :return: iterator over the url, status code and error message of every candidate
+    """
+    cache_path = constants.PROBE_CACHE_NAME_TEMPLATE.format(DOMAIN=domain)
+    journal_path = constants.PROBE_JOURNAL_NAME_TEMPLATE.format(DOMAIN=domain)
+    with util.ProbeCache(cache_path, probe_args.cache_ttl) as probe_cache, \
+            util.ProbeJournal(journal_path, constants.PROBE_JOURNAL_MAX_AGE * 86400, probe_candidates) as probe_journal:
+        known_results = probe_cache.lookup(probe_candidates)
+        print(f"Probe cache: {len(known_results)} hits, {len(probe_candidates) - len(known_results)} misses.")
+        journaled_results = probe_journal.read()
+        if journaled_results:
+            print(f"Resuming probe with {len(journaled_results)} candidates already probed.")
+        known_results.update(journaled_results)
+
+        for url in probe_candidates:
+            if url in known_results:
+                yield url, *known_results[url]
+
+        urls_to_probe = [url for url in probe_candidates if url not in known_results]
+        rate_limiter = util.AdaptiveRateLimiter.from_probe_parameters(probe_args)
+        for url, status_code, error_msg in util.probe_urls(urls_to_probe, probe_args, rate_limiter):
+            probe_cache.store(url, status_code, error_msg)
+            probe_journal.store(url, status_code, error_msg)
+            yield url, status_code, error_msg
+
+    if rate_limiter.statistics:
+        host_statistics = rate_limiter.statistics.values()
+        effective_rates = [statistics.get_effective_rate() for statistics in host_statistics]
+        print(f"Probed {len(effective_rates)} hosts with effective rates between {min(effective_rates):.2f} and "
+              f"{max(effective_rates):.2f} requests per sec, "
+              f"{sum(statistics.throttled for statistics in host_statistics)} responses were throttled.")
+        util.write_lines_to_file(constants.PROBE_RATES_NAME_TEMPLATE.format(DOMAIN=domain), rate_limiter.get_report())
+
+
+def check_status_codes(domain: str, probe_candidates: List[str],  # pylint: disable-msg=too-many-locals
+                       probe_args: util.ProbeParameters, shuffle: bool = True) -> List[str]:
     """
     Probe all candidates and filter out all urls with a response != 200.
+    Equivalent candidates are probed once and share the probe result of their representative.
+    Probe results of previous runs are reused within their time to live. Every new result is recorded in a journal,
+    so an interrupted probe step resumes with the candidates not probed yet.
+    Candidates not probed within the probe budget are marked with --- instead of a status code and listed separately.
     :param domain: domain to identify orphan pages for
+    :param probe_candidates: list of candidates to probe
     :param probe_args: parameters for probe
-    :return: amount of candidates left
+    :param shuffle: True to shuffle the candidates before probe, False to probe them in their given order
+    :return: sorted list of candidates left
     """
-    probe_candidates_path = constants.CANDIDATES_TO_PROBE_LIST_NAME_TEMPLATE.format(DOMAIN=domain)
-    probe_candidates = util.read_lines_from_file(probe_candidates_path)
-
+    representatives, equivalent_urls = canonicalize_candidates(domain, probe_candidates, probe_args.canonical_rules)
     potential_orphans = []
     all_status_codes = {}
     error_responses = {}
 
     # shuffle candidates before probe
-    probe_candidates_shuffled = probe_candidates.copy()
-    probe_candidates_shuffled = util.shuffle_candidates_list(probe_candidates_shuffled)
+    probe_order = util.shuffle_candidates_list(representatives.copy()) if shuffle else representatives
 
-    for url in tqdm(probe_candidates_shuffled):
-        # probe url
-        status_code, error_msg = util.probe_url(url, timeout_after=probe_args.timeout)
+    probe_results = iterate_probe_results(domain, probe_order, probe_args)
+    for probed_url, status_code, error_msg in tqdm(probe_results, total=len(probe_order)):
+        # analyse response code for the probed candidate and all its equivalent candidates
+        for url in equivalent_urls.get(probed_url, (probed_url,)):
+            if status_code == 200:
+                potential_orphans.append(url)
 
-        # analyse response code
-        if status_code == 200:
-            potential_orphans.append(url)
+            if error_msg is not None:
+                error_responses[url] = f"{error_msg:25s} {url}"
 
-        if error_msg is not None:
-            error_responses[url] = f"{error_msg:25s} {url}"
-
-        all_status_codes[url] = f"{status_code:03} {url}"
-        time.sleep(probe_args.interval)
+            all_status_codes[url] = f"{status_code:03} {url}"
 
     # sort results
     potential_orphans.sort()
-    all_status_codes_sorted = [all_status_codes[url] for url in probe_candidates]
-    error_responses_sorted = [error_responses[url] for url in probe_candidates if url in error_responses]
+    all_candidates = sorted(probe_candidates)
+    all_status_codes_sorted = [all_status_codes.get(url, f"--- {url}") for url in all_candidates]
+    error_responses_sorted = [error_responses[url] for url in all_candidates if url in error_responses]
+    not_probed = [url for url in all_candidates if url not in all_status_codes]
+    if not_probed:
+        print(f"Probe budget exhausted, {len(not_probed)} candidates were not probed.")
 
     # save results
     potential_orphans_path = constants.POTENTIAL_ORPHAN_LIST_NAME_TEMPLATE.format(DOMAIN=domain)
@@ -157,4 +292,11 @@ def check_status_codes(domain: str, probe_args: util.ProbeParameters) -> int:
     error_responses_path = constants.ERROR_RESPONSES_LIST_NAME_TEMPLATE.format(DOMAIN=domain)
     util.write_lines_to_file(error_responses_path, error_responses_sorted)
 
-    return len(potential_orphans)
+    not_probed_path = constants.NOT_PROBED_LIST_NAME_TEMPLATE.format(DOMAIN=domain)
+    if not_probed:
+        util.write_lines_to_file(not_probed_path, not_probed)
+    else:
+        util.delete_file(not_probed_path)
+
+    util.delete_file(constants.PROBE_JOURNAL_NAME_TEMPLATE.format(DOMAIN=domain))
+    return potential_orphans
@@ -1,13 +1,47 @@
 """This module contains all helper files for the orphan detection package."""
-from orphan_detection.util.internet_operations import probe_url, download_page_content
+from orphan_detection.util.internet_operations import HttpSessions, configure_http_sessions, get_http_sessions, \
+    get_http_session, probe_url, send_probe_request, parse_retry_after, download_page_content, download_to_gzip_file
 
-from orphan_detection.util.file_operations import is_file, create_directory, delete_directory, \
-    save_to_bin_file, read_from_bin_file, read_lines_from_file, write_lines_to_file
+from orphan_detection.util.file_operations import is_file, create_directory, delete_file, delete_directory, \
+    list_files, save_to_bin_file, read_from_bin_file, read_lines_from_file, iterate_lines_from_file, \
+    write_lines_to_file, append_line_to_file, merge_gzip_files, save_to_json_file, read_from_json_file, FileBackedList
+
+from orphan_detection.util.checkpoint_operations import CheckpointWriter
+
+from orphan_detection.util.archive_index import get_archive_index, query_indexed_urls, query_last_seen_dates, \
+    query_oldest_timestamp, scan_last_seen_dates
+
+from orphan_detection.util.archive_columns import get_archive_columns, select_current_url_ids, iterate_column_urls
+
+from orphan_detection.util.external_sort import external_sort_archive_urls, iterate_flagged_urls
 
 from orphan_detection.util.data_objects import DUDEParameters, ProbeParameters, OrphanScoreParameters, \
-    SizeFilterParameters, ContentDownloadParameters, PageResponse
+    SizeFilterParameters, ContentDownloadParameters, ArchiveDownloadParameters, ExtractionParameters, \
+    FilterParameters, PageResponse, ProbeResponse, BatchResult
+
+from orphan_detection.util.misc_functions import fnv_1a_64, get_md5_hash, shuffle_candidates_list, \
+    parse_probe_budget
+
+from orphan_detection.util.url_operations import ParsedUrls, parse_urls, select_parsed_urls, get_host, get_url_host, \
+    get_host_ends, get_path, get_extension, compile_extension_filter, get_url_extension, \
+    is_resource_url, filter_resource_urls, resolve_link
+
+from orphan_detection.util.url_canonicalization import compile_canonicalization_rules, canonicalize_url, \
+    group_equivalent_urls, get_url_origin
+
+from orphan_detection.util.rate_limiting import TokenBucket, HostRateLimiter, HostStatistics, \
+    AdaptiveRateLimiter
+
+from orphan_detection.util.circuit_breaker import CircuitBreaker, HostCircuitBreakers, configure_circuit_breakers, \
+    get_circuit_breakers
+
+from orphan_detection.util.host_resolution import HostResolver, resolve_host, resolve_hosts
+
+from orphan_detection.util.probe_engine import HostScheduler, ProbeBudget, probe_urls
+
+from orphan_detection.util.probe_cache import ProbeCache
 
-from orphan_detection.util.misc_functions import fnv_1a_64, get_md5_hash, is_resource_url, shuffle_candidates_list
+from orphan_detection.util.probe_journal import ProbeJournal
 
 from orphan_detection.util.date_operations import get_current_year, get_date, parse_year_argument, \
     get_default_current_sitemap_filter
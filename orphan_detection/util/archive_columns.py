@@ -0,0 +1,108 @@
+"""This file contains all functions for the memory-mapped columnar cache of a downloaded web archive data file."""
+import mmap
+import os
+from array import array
+from typing import Iterator, Tuple
+
+import numpy as np
+
+from orphan_detection import constants
+from orphan_detection.util.file_operations import create_directory, delete_directory, iterate_lines_from_file
+
+__all__ = ["get_archive_columns", "select_current_url_ids", "iterate_column_urls"]
+
+# file names of the single columns inside the cache directory
+URL_TABLE_FILE = "urls.bin"
+URL_OFFSETS_FILE = "url_offsets.npy"
+URL_IDS_FILE = "url_ids.npy"
+TIMESTAMPS_FILE = "timestamps.npy"
+LENGTHS_FILE = "lengths.npy"
+
+
+def build_archive_columns(zipped_archive_file: str, columns_directory: str) -> None:
+    """
+    Build the columnar cache for given web archive data file. The cache contains a sorted table of all unique urls,
+    joined by line breaks, with the offsets of every url and one array for the url ids, timestamps and lengths
+    of all captures.
+    :param zipped_archive_file: path to the file with the web archive data
+    :param columns_directory: path to the directory to save the cache to
+    :return:
+    """
+    # intern urls and collect capture columns
+    url_lookup = {}
+    url_ids, timestamps, lengths = array('q'), array('q'), array('q')
+    for web_archive_line in iterate_lines_from_file(zipped_archive_file, zipped_file=True):
+        if not web_archive_line:
+            continue
+        timestamp, url, *length = web_archive_line.split(" ", 3)
+        url_ids.append(url_lookup.setdefault(url, len(url_lookup)))
+        timestamps.append(int(timestamp))
+        lengths.append(int(length[0]) if length and length[0].isdigit() else -1)
+
+    # renumber url ids in sorted url order
+    sorted_urls = sorted(url_lookup)
+    url_ranks = np.empty(len(sorted_urls), dtype=np.uint32)
+    url_ranks[np.fromiter((url_lookup[url] for url in sorted_urls), dtype=np.int64, count=len(sorted_urls))] = \
+        np.arange(len(sorted_urls), dtype=np.uint32)
+    del url_lookup
+
+    encoded_urls = [url.encode(constants.DEFAULT_ENCODING) for url in sorted_urls]
+    url_offsets = np.zeros(len(encoded_urls) + 1, dtype=np.int64)
+    url_offsets[1:] = np.cumsum(np.fromiter((len(url) + 1 for url in encoded_urls), dtype=np.int64,
+                                            count=len(encoded_urls)))
+
+    # save all columns in a separate directory and replace the previous cache afterwards
+    part_directory = columns_directory.rstrip("/") + ".part/"
+    delete_directory(part_directory)
+    create_directory(part_directory)
+    with open(os.path.join(part_directory, URL_TABLE_FILE), 'wb') as outfile:
+        outfile.write(b"\n".join(encoded_urls))
+    np.save(os.path.join(part_directory, URL_OFFSETS_FILE), url_offsets)
+    np.save(os.path.join(part_directory, URL_IDS_FILE), url_ranks[np.frombuffer(url_ids, dtype=np.int64)])
+    np.save(os.path.join(part_directory, TIMESTAMPS_FILE), np.frombuffer(timestamps, dtype=np.int64))
+    np.save(os.path.join(part_directory, LENGTHS_FILE), np.frombuffer(lengths, dtype=np.int64))
+
+    delete_directory(columns_directory)
+    os.replace(part_directory, columns_directory)
+
+
+def get_archive_columns(zipped_archive_file: str) -> str:
+    """Returns the path to the columnar cache for given web archive data file and builds it if it does not exist yet
+    or is older than the web archive data file."""
+    columns_directory = constants.ARCHIVE_COLUMNS_DIRECTORY_TEMPLATE.format(ARCHIVE_FILE=zipped_archive_file)
+    url_ids_file = os.path.join(columns_directory, URL_IDS_FILE)
+    if not os.path.exists(url_ids_file) or os.path.getmtime(url_ids_file) < os.path.getmtime(zipped_archive_file):
+        build_archive_columns(zipped_archive_file, columns_directory)
+    return columns_directory
+
+
+def select_current_url_ids(columns_directory: str, current_sitemap_key: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Select the ids of all urls captured at or after the current sitemap key and the ids of all other urls.
+    :param columns_directory: path to the columnar cache
+    :param current_sitemap_key: earliest timestamp (as 14-digit number) to identify an url as part of the sitemap
+    :return: tuple of sorted url ids of the current sitemap and sorted url ids of all other urls
+    """
+    url_ids = np.load(os.path.join(columns_directory, URL_IDS_FILE), mmap_mode='r')
+    timestamps = np.load(os.path.join(columns_directory, TIMESTAMPS_FILE), mmap_mode='r')
+    amount_urls = len(np.load(os.path.join(columns_directory, URL_OFFSETS_FILE), mmap_mode='r')) - 1
+
+    current_url_ids = np.unique(url_ids[timestamps >= current_sitemap_key])
+    other_url_ids = np.setdiff1d(np.arange(amount_urls, dtype=url_ids.dtype), current_url_ids, assume_unique=True)
+    return current_url_ids, other_url_ids
+
+
+def iterate_column_urls(columns_directory: str, url_ids: np.ndarray | None = None) -> Iterator[str]:
+    """Returns the urls for given sorted url ids from the memory-mapped url table, all urls if no ids are given."""
+    url_offsets = np.load(os.path.join(columns_directory, URL_OFFSETS_FILE), mmap_mode='r')
+    if len(url_offsets) < 2:
+        return
+    if url_ids is None:
+        url_ids = np.arange(len(url_offsets) - 1)
+
+    url_starts = url_offsets[url_ids].tolist()
+    url_ends = (url_offsets[url_ids + 1] - 1).tolist()
+    with open(os.path.join(columns_directory, URL_TABLE_FILE), 'rb') as infile, \
+            mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as url_table:
+        for url_start, url_end in zip(url_starts, url_ends):
+            yield url_table[url_start:url_end].decode(constants.DEFAULT_ENCODING)
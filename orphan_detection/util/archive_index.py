@@ -0,0 +1,142 @@
+"""This file contains all functions for the persistent url index of a downloaded web archive data file."""
+import os
+import sqlite3
+from contextlib import closing
+from typing import Dict, Iterator, List, Tuple
+
+from orphan_detection import constants
+from orphan_detection.util.file_operations import is_file, delete_file, iterate_lines_from_file
+
+__all__ = ["get_archive_index", "query_indexed_urls", "query_last_seen_dates", "query_oldest_timestamp",
+           "scan_last_seen_dates"]
+
+# amount of urls looked up in a single query
+INDEX_LOOKUP_BATCH_SIZE = 500
+
+CREATE_URL_TABLE = "CREATE TABLE urls (url TEXT PRIMARY KEY, first_seen INTEGER, last_seen INTEGER, " \
+                   "captures INTEGER, length INTEGER) WITHOUT ROWID"
+CREATE_META_TABLE = "CREATE TABLE meta (key TEXT PRIMARY KEY, value INTEGER)"
+INSERT_URL = "INSERT INTO urls VALUES (?, ?, ?, ?, ?)"
+
+# first seen date, last seen date, amount of captures and length of the last seen capture of an url
+UrlCaptures = Tuple[str, str, int, str]
+
+
+def aggregate_captures(zipped_archive_file: str) -> Dict[str, UrlCaptures]:
+    """
+    Reads the web archive data line by line and aggregates all captures of every url in a single pass.
+    The timestamps are compared in their 14-digit string form and converted once per url afterwards.
+    :param zipped_archive_file: path to the file with the web archive data
+    :return: mapping of every url to its first seen date, last seen date, amount of captures
+             and length of the last seen capture (empty string if unknown)
+    """
+    url_captures = {}
+    for web_archive_line in iterate_lines_from_file(zipped_archive_file, zipped_file=True):
+        if not web_archive_line:
+            continue
+        timestamp, url, *length = web_archive_line.split(" ", 3)
+        captures = url_captures.get(url)
+        if captures is None:
+            url_captures[url] = timestamp, timestamp, 1, length[0] if length else ""
+            continue
+
+        # immutable tuples keep the garbage collector from tracking every url
+        first_seen, last_seen, amount_captures, last_length = captures
+        if timestamp > last_seen:
+            last_seen, last_length = timestamp, length[0] if length else ""
+        elif timestamp < first_seen:
+            first_seen = timestamp
+        url_captures[url] = first_seen, last_seen, amount_captures + 1, last_length
+    return url_captures
+
+
+def iterate_index_rows(url_captures: Dict[str, UrlCaptures]) -> Iterator[Tuple[str, int, int, int, int | None]]:
+    """Returns the aggregated captures as rows of the url index in sorted url order."""
+    for url in sorted(url_captures):
+        first_seen, last_seen, amount_captures, last_length = url_captures[url]
+        yield url, int(first_seen), int(last_seen), amount_captures, int(last_length) if last_length.isdigit() else None
+
+
+def build_archive_index(zipped_archive_file: str, index_file: str) -> None:
+    """
+    Build the url index for given web archive data file with first seen date, last seen date,
+    amount of captures and length of the last seen capture for every url.
+    The captures are aggregated in memory and inserted once per url in sorted order.
+    :param zipped_archive_file: path to the file with the web archive data
+    :param index_file: path to save the index to
+    :return:
+    """
+    part_file = f"{index_file}.part"
+    delete_file(part_file)
+    with closing(sqlite3.connect(part_file)) as connection:
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        connection.execute(CREATE_URL_TABLE)
+        connection.execute(CREATE_META_TABLE)
+        connection.executemany(INSERT_URL, iterate_index_rows(aggregate_captures(zipped_archive_file)))
+        connection.execute("INSERT INTO meta SELECT 'oldest_timestamp', min(first_seen) FROM urls")
+        connection.commit()
+    os.replace(part_file, index_file)
+    os.chmod(index_file, constants.CHMOD_USER_ONLY_FILE)
+
+
+def get_archive_index(zipped_archive_file: str) -> str:
+    """Returns the path to the url index for given web archive data file and builds it if it does not exist yet
+    or is older than the web archive data file."""
+    index_file = constants.ARCHIVE_INDEX_NAME_TEMPLATE.format(ARCHIVE_FILE=zipped_archive_file)
+    if not is_file(index_file) or os.path.getmtime(index_file) < os.path.getmtime(zipped_archive_file):
+        build_archive_index(zipped_archive_file, index_file)
+    return index_file
+
+
+def get_last_seen_condition(last_seen_from: int | None, last_seen_before: int | None) -> Tuple[str, List[int]]:
+    """Returns the sql where-clause and its parameters to filter urls on their last seen date."""
+    conditions, parameters = [], []
+    if last_seen_from is not None:
+        conditions.append("last_seen >= ?")
+        parameters.append(last_seen_from)
+    if last_seen_before is not None:
+        conditions.append("last_seen < ?")
+        parameters.append(last_seen_before)
+    if not conditions:
+        return "", parameters
+    return " WHERE " + " AND ".join(conditions), parameters
+
+
+def query_indexed_urls(index_file: str, last_seen_from: int | None = None,
+                       last_seen_before: int | None = None) -> Iterator[str]:
+    """Returns all indexed urls in sorted order, optionally filtered on their last seen date (as 14-digit number)."""
+    condition, parameters = get_last_seen_condition(last_seen_from, last_seen_before)
+    with closing(sqlite3.connect(index_file)) as connection:
+        for (url,) in connection.execute(f"SELECT url FROM urls{condition} ORDER BY url", parameters):
+            yield url
+
+
+def query_last_seen_dates(index_file: str, urls: List[str]) -> Dict[str, int]:
+    """Returns a mapping of given urls to their last seen dates, urls missing in the index are left out."""
+    last_seen_dates = {}
+    with closing(sqlite3.connect(index_file)) as connection:
+        for batch_start in range(0, len(urls), INDEX_LOOKUP_BATCH_SIZE):
+            batch = urls[batch_start:batch_start + INDEX_LOOKUP_BATCH_SIZE]
+            placeholders = ", ".join("?" * len(batch))
+            last_seen_dates.update(connection.execute(
+                f"SELECT url, last_seen FROM urls WHERE url IN ({placeholders})", batch))
+    return last_seen_dates
+
+
+def query_oldest_timestamp(index_file: str) -> int | None:
+    """Returns the timestamp of the oldest capture in the web archive data, None if it has no entries."""
+    with closing(sqlite3.connect(index_file)) as connection:
+        return connection.execute("SELECT value FROM meta WHERE key = 'oldest_timestamp'").fetchone()[0]
+
+
+def scan_last_seen_dates(zipped_archive_file: str, urls: List[str]) -> Dict[str, int]:
+    """Returns a mapping of given urls to their last seen dates by a single pass over the web archive data
+    without an index, only the given urls are kept in memory. Urls missing in the data are left out."""
+    last_seen_dates = dict.fromkeys(urls, "")
+    for web_archive_line in iterate_lines_from_file(zipped_archive_file, zipped_file=True):
+        timestamp, _, url = web_archive_line.partition(" ")
+        url = url.partition(" ")[0]
+        if url in last_seen_dates and timestamp > last_seen_dates[url]:
+            last_seen_dates[url] = timestamp
+    return {url: int(timestamp) for url, timestamp in last_seen_dates.items() if timestamp}
@@ -0,0 +1,42 @@
+"""This file contains the helper class to write interim result files asynchronously."""
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, List
+
+from orphan_detection.util.file_operations import write_lines_to_file
+
+__all__ = ["CheckpointWriter"]
+
+
+class CheckpointWriter:
+    """Writes interim result files in a background thread in the order they are submitted,
+    or skips them completely if checkpoints are deactivated."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._executor = ThreadPoolExecutor(max_workers=1) if enabled else None
+        self._pending: List[Future] = []
+
+    def write(self, path: str, content: Iterable[str]) -> None:
+        """Schedules the lines to be saved to given path. The content must not be changed afterwards."""
+        if self.enabled:
+            self._pending.append(self._executor.submit(write_lines_to_file, path, content))
+
+    def wait(self) -> None:
+        """Waits until all scheduled files are saved and raises the first error that occurred."""
+        pending, self._pending = self._pending, []
+        for future in pending:
+            future.result()
+
+    def close(self) -> None:
+        """Waits until all scheduled files are saved and stops the background thread."""
+        try:
+            self.wait()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+
+    def __enter__(self) -> "CheckpointWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
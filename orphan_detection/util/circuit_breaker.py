@@ -0,0 +1,122 @@
+"""This file contains the circuit breakers per origin (scheme, host and port), which stop sending requests
+to origins failing again and again."""
+import threading
+from typing import Dict
+
+from orphan_detection import constants
+
+__all__ = ["CircuitBreaker", "HostCircuitBreakers", "configure_circuit_breakers", "get_circuit_breakers"]
+
+# states of a circuit breaker
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+# time (in sec) to check again whether the test request of a half-open breaker finished
+HALF_OPEN_RECHECK_TIME = 1.0
+
+
+class CircuitBreaker:  # pylint: disable-msg=too-few-public-methods
+    """Circuit breaker of a single origin. It opens after the failure threshold of consecutive failures is reached,
+    after the recovery time a single request tests the origin (half-open) and closes the breaker again on success."""
+    __slots__ = ("state", "failures", "opened_at", "failed_trials")
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.failed_trials = 0
+
+    def open(self, now: float) -> None:
+        """Opens the breaker, a failed test request counts as failed trial."""
+        if self.state == HALF_OPEN:
+            self.failed_trials += 1
+        self.state = OPEN
+        self.opened_at = now
+
+
+class HostCircuitBreakers:
+    """Circuit breakers for every origin, shared by all requests of the current process.
+    A failure threshold of 0 disables the circuit breakers."""
+
+    def __init__(self, failure_threshold: int, recovery_time: float, max_trials: int):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.max_trials = max_trials
+        self.lock = threading.Lock()
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def configure(self, failure_threshold: int, recovery_time: float) -> None:
+        """Sets the failure threshold and recovery time for all following requests and closes all breakers."""
+        with self.lock:
+            self.failure_threshold, self.recovery_time = failure_threshold, recovery_time
+            self.breakers = {}
+
+    def get_breaker(self, origin: str) -> CircuitBreaker:
+        """Returns the circuit breaker of given origin, created on its first request."""
+        if origin not in self.breakers:
+            self.breakers[origin] = CircuitBreaker()
+        return self.breakers[origin]
+
+    def has_given_up(self, origin: str) -> bool:
+        """Returns True if given origin failed the max amount of test requests, so no request is sent to it anymore."""
+        with self.lock:
+            return self.failure_threshold > 0 and self.get_breaker(origin).failed_trials >= self.max_trials
+
+    def get_delay(self, origin: str, now: float) -> float:
+        """Returns the time (in sec) until the next request to given origin may be sent,
+        0 if the breaker is closed or the origin is given up."""
+        with self.lock:
+            breaker = self.get_breaker(origin)
+            if self.failure_threshold <= 0 or breaker.state == CLOSED or breaker.failed_trials >= self.max_trials:
+                return 0.0
+            if breaker.state == HALF_OPEN:  # test request still running
+                return HALF_OPEN_RECHECK_TIME
+            return max(0.0, breaker.opened_at + self.recovery_time - now)
+
+    def allow_request(self, origin: str, now: float) -> bool:
+        """Returns True if a request to given origin may be sent, a request after the recovery time tests the origin."""
+        with self.lock:
+            breaker = self.get_breaker(origin)
+            if self.failure_threshold <= 0 or breaker.state == CLOSED:
+                return True
+            if breaker.state == HALF_OPEN or breaker.failed_trials >= self.max_trials \
+                    or now - breaker.opened_at < self.recovery_time:
+                return False
+            breaker.state = HALF_OPEN
+            return True
+
+    def record_result(self, origin: str, failed: bool, now: float) -> None:
+        """Registers the result of a request to given origin, a timeout or connection error counts as failure."""
+        with self.lock:
+            if self.failure_threshold <= 0:
+                return
+            breaker = self.get_breaker(origin)
+            if not failed:
+                breaker.state, breaker.failures, breaker.failed_trials = CLOSED, 0, 0
+                return
+            if breaker.state == CLOSED:  # failures of an open breaker keep the count it was opened with
+                breaker.failures += 1
+            if breaker.state == HALF_OPEN or (breaker.state == CLOSED and breaker.failures >= self.failure_threshold):
+                breaker.open(now)
+
+    def get_reason(self, origin: str) -> str:
+        """Returns the error reason of requests not sent because of the open circuit breaker of given origin."""
+        with self.lock:
+            breaker = self.get_breaker(origin)
+            return f"[ERROR] CircuitOpen: {breaker.failures} consecutive failures of {origin}"
+
+
+HOST_CIRCUIT_BREAKERS = HostCircuitBreakers(constants.CIRCUIT_BREAKER_DEFAULT_THRESHOLD,
+                                            constants.CIRCUIT_BREAKER_DEFAULT_RECOVERY_TIME,
+                                            constants.CIRCUIT_BREAKER_MAX_TRIALS)
+
+
+def configure_circuit_breakers(failure_threshold: int, recovery_time: float) -> None:
+    """Configures the circuit breakers of all origins for all following requests."""
+    HOST_CIRCUIT_BREAKERS.configure(failure_threshold, recovery_time)
+
+
+def get_circuit_breakers() -> HostCircuitBreakers:
+    """Returns the circuit breakers shared by all probe and download requests of the current process."""
+    return HOST_CIRCUIT_BREAKERS
@@ -1,8 +1,10 @@
 """This file contains the definition of all helper data classes."""
 from dataclasses import dataclass
+from typing import FrozenSet
 
 __all__ = ["DUDEParameters", "ProbeParameters", "OrphanScoreParameters", "PageResponse", "SizeFilterParameters",
-           "ContentDownloadParameters"]
+           "ContentDownloadParameters", "ArchiveDownloadParameters", "ExtractionParameters", "FilterParameters",
+           "ProbeResponse", "BatchResult"]
 
 
 @dataclass(frozen=True, slots=True)
@@ -13,13 +15,24 @@ class DUDEParameters:
     large_link_len_threshold: int
     large_link_count: int
     subdomain_threshold: float | int
+    workers: int = 1
+    full_recompute: bool = False
 
 
 @dataclass(frozen=True, slots=True)
-class ProbeParameters:
+class ProbeParameters:  # pylint: disable-msg=too-many-instance-attributes
     """Data Carrier class for probe parameters."""
     timeout: float | int
     interval: float | int
+    concurrency: int = 1
+    cache_ttl: float = 0
+    min_interval: float | None = None  # bounds of the adaptive interval per host, None keeps the interval fixed
+    max_interval: float | None = None
+    retries: int = 0  # max amount of retries of throttled requests
+    canonical_rules: FrozenSet[str] = frozenset()  # rules to probe equivalent candidates once, empty probes all
+    time_budget: float = 0  # max time (in sec) to start requests in, 0 is unlimited
+    request_budget: int = 0  # max amount of requests to start, 0 is unlimited
+    prioritize: bool = False  # probe candidates in the order of their priority instead of in random order
 
 
 @dataclass(frozen=True, slots=True)
@@ -44,6 +57,29 @@ class ContentDownloadParameters:
     interval: float
 
 
+@dataclass(frozen=True, slots=True)
+class ArchiveDownloadParameters:
+    """Data Carrier class for web archive download parameters."""
+    cdx_url: str
+    slice_years: int
+    workers: int
+    refresh: bool
+
+
+@dataclass(frozen=True, slots=True)
+class ExtractionParameters:
+    """Data Carrier class for candidate extraction parameters."""
+    columnar_cache: bool
+    memory_budget: int
+
+
+@dataclass(frozen=True, slots=True)
+class FilterParameters:
+    """Data Carrier class for ressource file filter parameters."""
+    extensions: FrozenSet[str]
+    workers: int
+
+
 @dataclass(frozen=True, slots=True)
 class PageResponse:
     """Data Carrier class for the result of a single download request."""
@@ -51,3 +87,21 @@ class PageResponse:
     content: bytes | str
     content_header: None | str
     encoding: None | str
+
+
+@dataclass(frozen=True, slots=True)
+class ProbeResponse:
+    """Data Carrier class for the result of a single probe request."""
+    status_code: int
+    error_msg: None | str
+    latency: float
+    retry_after: None | float
+
+
+@dataclass(frozen=True, slots=True)
+class BatchResult:
+    """Data Carrier class for the result of a single domain in a batch process step."""
+    domain: str
+    exit_code: int
+    error_msg: None | str
+    duration: float
@@ -0,0 +1,112 @@
+"""This file contains all functions to sort and deduplicate the urls of web archive data files
+with a limited memory budget by spilling sorted runs to disk and merging them afterwards."""
+import heapq
+import os
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from orphan_detection.util.file_operations import create_directory, delete_file, iterate_lines_from_file, \
+    write_lines_to_file
+
+__all__ = ["external_sort_archive_urls", "iterate_flagged_urls"]
+
+# estimated memory usage of a single url entry in the run buffer without the url characters
+RUN_ENTRY_OVERHEAD = 150
+
+# max amount of runs merged at once to limit the amount of open files
+MAX_MERGED_RUNS = 64
+
+FlaggedUrl = Tuple[str, bool]
+
+
+def iterate_flagged_urls(path: str) -> Iterator[FlaggedUrl]:
+    """Reads a sorted run line by line and returns every url with its flag."""
+    for line in iterate_lines_from_file(path):
+        if line:
+            yield line[1:], line[0] == "1"
+
+
+def write_flagged_run(path: str, flagged_urls: Iterable[FlaggedUrl]) -> None:
+    """Saves urls with their flags as sorted run, every line is the flag (0 or 1) directly followed by the url."""
+    write_lines_to_file(path, (f"{int(flag)}{url}" for url, flag in flagged_urls))
+
+
+def merge_flagged_runs(paths: List[str]) -> Iterator[FlaggedUrl]:
+    """Merges multiple sorted runs and returns every url once with all its flags combined by a logical or."""
+    merged_urls = heapq.merge(*(iterate_flagged_urls(path) for path in paths), key=lambda entry: entry[0])
+    previous_url, previous_flag = None, False
+    for url, flag in merged_urls:
+        if url == previous_url:
+            previous_flag = previous_flag or flag
+            continue
+        if previous_url is not None:
+            yield previous_url, previous_flag
+        previous_url, previous_flag = url, flag
+    if previous_url is not None:
+        yield previous_url, previous_flag
+
+
+def spill_run(run_directory: str, run_buffer: Dict[str, bool], run_paths: List[str]) -> None:
+    """Sorts the buffered urls and saves them as a new run."""
+    run_path = os.path.join(run_directory, f"run_{len(run_paths):06d}.txt")
+    write_flagged_run(run_path, ((url, run_buffer[url]) for url in sorted(run_buffer)))
+    run_paths.append(run_path)
+    run_buffer.clear()
+
+
+def external_sort_archive_urls(zipped_archive_file: str, current_sitemap_key: int, run_directory: str,
+                               memory_budget: int) -> Tuple[str, int]:
+    """
+    Sort and deduplicate all urls of the web archive data and flag the ones captured at or after
+    the current sitemap key, while the buffered urls are kept below the memory budget.
+    :param zipped_archive_file: path to the file with the web archive data
+    :param current_sitemap_key: earliest timestamp (as 14-digit number) to identify an url as part of the sitemap
+    :param run_directory: directory to save the sorted runs to
+    :param memory_budget: max amount of bytes for the buffered urls
+    :return: tuple of the path to the merged sorted run and the amount of urls not flagged
+    """
+    create_directory(run_directory)
+    current_key = str(current_sitemap_key)
+    run_buffer, run_buffer_size, run_paths = {}, 0, []
+
+    # spill sorted runs whenever the buffer exceeds the memory budget
+    for web_archive_line in iterate_lines_from_file(zipped_archive_file, zipped_file=True):
+        if not web_archive_line:
+            continue
+        timestamp, url = web_archive_line.split(" ", 2)[:2]
+        if url in run_buffer:
+            if timestamp >= current_key:
+                run_buffer[url] = True
+            continue
+        run_buffer[url] = timestamp >= current_key
+        run_buffer_size += len(url) + RUN_ENTRY_OVERHEAD
+        if run_buffer_size >= memory_budget:
+            spill_run(run_directory, run_buffer, run_paths)
+            run_buffer_size = 0
+    spill_run(run_directory, run_buffer, run_paths)
+
+    # merge runs in multiple passes if there are too many to open at once
+    while len(run_paths) > MAX_MERGED_RUNS:
+        merged_run_paths = []
+        for group_start in range(0, len(run_paths), MAX_MERGED_RUNS):
+            group = run_paths[group_start:group_start + MAX_MERGED_RUNS]
+            merged_run_path = os.path.join(run_directory, f"merged_{len(run_paths):06d}_{group_start:06d}.txt")
+            write_flagged_run(merged_run_path, merge_flagged_runs(group))
+            for run_path in group:
+                delete_file(run_path)
+            merged_run_paths.append(merged_run_path)
+        run_paths = merged_run_paths
+
+    # final merge with counting of the urls not part of the current sitemap
+    amount_not_flagged = 0
+
+    def count_not_flagged(flagged_urls: Iterator[FlaggedUrl]) -> Iterator[FlaggedUrl]:
+        nonlocal amount_not_flagged
+        for url, flag in flagged_urls:
+            amount_not_flagged += not flag
+            yield url, flag
+
+    merged_path = os.path.join(run_directory, "merged.txt")
+    write_flagged_run(merged_path, count_not_flagged(merge_flagged_runs(run_paths)))
+    for run_path in run_paths:
+        delete_file(run_path)
+    return merged_path, amount_not_flagged
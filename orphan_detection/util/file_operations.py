@@ -1,14 +1,17 @@
 """This file contains all file related helper functions for the module."""
 import gzip
+import json
 import os
 import shutil
 
-from typing import List
+from typing import Any, Iterable, Iterator, List
 
 from orphan_detection import constants
 
-__all__ = ["create_directory", "is_file", "delete_directory",
-           "save_to_bin_file", "read_from_bin_file", "read_lines_from_file", "write_lines_to_file"]
+__all__ = ["create_directory", "is_file", "delete_file", "delete_directory", "list_files",
+           "save_to_bin_file", "read_from_bin_file", "read_lines_from_file", "iterate_lines_from_file",
+           "write_lines_to_file", "append_line_to_file", "merge_gzip_files", "save_to_json_file",
+           "read_from_json_file", "FileBackedList"]
 
 
 def create_directory(path: str) -> None:
@@ -22,6 +25,13 @@ def is_file(path: str) -> bool:
     return os.path.exists(path) and os.path.isfile(path)
 
 
+def list_files(path: str) -> List[str]:
+    """Returns the names of all files in the directory at given path or an empty list if it does not exist."""
+    if not os.path.isdir(path):
+        return []
+    return [name for name in os.listdir(path) if os.path.isfile(os.path.join(path, name))]
+
+
 def save_to_bin_file(path: str, content: bytes, user_restricted: bool = True) -> None:
     """Saves given content in bytes form to given file path."""
     with open(path, 'wb') as outfile:
@@ -47,6 +57,13 @@ def save_to_gzip_file(path: str, content: str, user_restricted: bool = True) ->
         os.chmod(path, constants.CHMOD_USER_ONLY_FILE)
 
 
+def save_to_json_file(path: str, content: Any, user_restricted: bool = True) -> None:
+    """Saves given content in json form to given file path, replacing an existing file only when finished."""
+    part_path = f"{path}.part"
+    save_to_file(part_path, json.dumps(content, indent=2, sort_keys=True), user_restricted)
+    os.replace(part_path, path)
+
+
 def read_from_bin_file(path: str) -> bytes:
     """Reads in the content from a binary file at given file path."""
     with open(path, 'rb') as infile:
@@ -68,6 +85,11 @@ def read_from_gzip_file(path: str) -> str:
     return content.decode(constants.DEFAULT_ENCODING)
 
 
+def read_from_json_file(path: str) -> Any:
+    """Reads in the json content from a regular file at given file path."""
+    return json.loads(read_from_file(path))
+
+
 def read_lines_from_file(path: str, zipped_file: bool = False) -> List[str]:
     """Reads in the content from given path and return a list of single lines."""
     if zipped_file:
@@ -77,13 +99,79 @@ def read_lines_from_file(path: str, zipped_file: bool = False) -> List[str]:
     return content.splitlines()
 
 
-def write_lines_to_file(path: str, content: List[str], zipped_file: bool = False, user_restricted: bool = True) -> None:
-    """Saves single lines to given path."""
-    content_combined = "\n".join(content)
+def iterate_lines_from_file(path: str, zipped_file: bool = False) -> Iterator[str]:
+    """Reads in the content from given path line by line without loading the whole file into memory."""
     if zipped_file:
-        save_to_gzip_file(path, content_combined, user_restricted)
+        infile = gzip.open(path, 'rt', encoding=constants.DEFAULT_ENCODING)
     else:
-        save_to_file(path, content_combined, user_restricted)
+        infile = open(path, 'r', encoding=constants.DEFAULT_ENCODING)  # pylint: disable-msg=consider-using-with
+    with infile:
+        for line in infile:
+            yield line.rstrip("\r\n")
+
+
+class FileBackedList:  # pylint: disable-msg=too-few-public-methods
+    """Sized iterable over the lines of a file, the lines are read from disk on every iteration
+    instead of being kept in memory."""
+
+    def __init__(self, path: str, length: int):
+        self.path = path
+        self.length = length
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self) -> Iterator[str]:
+        return (line for line in iterate_lines_from_file(self.path) if line)
+
+
+def write_lines_to_file(path: str, content: Iterable[str], zipped_file: bool = False,
+                        user_restricted: bool = True) -> None:
+    """Saves single lines to given path one after another without combining them in memory first."""
+    if zipped_file:
+        outfile = gzip.open(path, 'wt', encoding=constants.DEFAULT_ENCODING)
+    else:
+        outfile = open(path, 'w', encoding=constants.DEFAULT_ENCODING)  # pylint: disable-msg=consider-using-with
+    with outfile:
+        lines = iter(content)
+        for line in lines:
+            outfile.write(line)
+            break
+        for line in lines:
+            outfile.write("\n")
+            outfile.write(line)
+
+    if user_restricted:
+        os.chmod(path, constants.CHMOD_USER_ONLY_FILE)
+
+
+def append_line_to_file(path: str, line: str, user_restricted: bool = True) -> None:
+    """Appends a single line to given path and flushes it to disk immediately."""
+    with open(path, 'a', encoding=constants.DEFAULT_ENCODING) as outfile:
+        outfile.write(f"{line}\n")
+        outfile.flush()
+        os.fsync(outfile.fileno())
+    if user_restricted:
+        os.chmod(path, constants.CHMOD_USER_ONLY_FILE)
+
+
+def merge_gzip_files(paths: List[str], target_path: str, user_restricted: bool = True) -> None:
+    """Merges the lines of multiple compressed files line by line into a single compressed file at given path."""
+    part_path = f"{target_path}.part"
+    with gzip.open(part_path, 'wb') as outfile:
+        for path in paths:
+            with gzip.open(path, 'rb') as infile:
+                for line in infile:
+                    outfile.write(line if line.endswith(b"\n") else line + b"\n")
+    os.replace(part_path, target_path)
+    if user_restricted:
+        os.chmod(target_path, constants.CHMOD_USER_ONLY_FILE)
+
+
+def delete_file(path: str) -> None:
+    """Delete the file from given path if it exists."""
+    if os.path.exists(path):
+        os.remove(path)
 
 
 def delete_directory(path: str):
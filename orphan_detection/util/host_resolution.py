@@ -0,0 +1,58 @@
+"""This file contains the concurrent resolution of hosts with a cache for all lookups of the current process."""
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Tuple
+
+__all__ = ["HostResolver", "resolve_host", "resolve_hosts"]
+
+
+def resolve_host(host: str) -> Tuple[str | None, bool]:
+    """Looks up the addresses of given host and returns None if it resolves, otherwise the DNS error reason.
+    The second value is False for temporary failures of the resolver, which are not worth caching."""
+    if not host:
+        return None, True
+    try:
+        socket.getaddrinfo(host.strip("[]"), None)
+        return None, True
+    except socket.gaierror as exc:
+        return f"[ERROR] DNSError: {exc}", exc.errno != socket.EAI_AGAIN
+    except UnicodeError as exc:
+        return f"[ERROR] DNSError: {exc}", True
+
+
+class HostResolver:  # pylint: disable-msg=too-few-public-methods
+    """Cache of the DNS lookups of the current process, so every host is resolved only once."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.results: Dict[str, str | None] = {}
+
+    def resolve(self, hosts: Iterable[str], workers: int) -> Dict[str, str | None]:
+        """
+        Resolves all given hosts not cached yet concurrently.
+        :param hosts: hosts to resolve
+        :param workers: max amount of lookups running at the same time
+        :return: mapping of every host to None if it resolves, otherwise to the DNS error reason
+        """
+        hosts = set(hosts)
+        with self.lock:
+            results = {host: self.results[host] for host in hosts if host in self.results}
+        unknown_hosts = [host for host in hosts if host not in results]
+        if unknown_hosts:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+                for host, (error_msg, cacheable) in zip(unknown_hosts, executor.map(resolve_host, unknown_hosts)):
+                    results[host] = error_msg
+                    if cacheable:
+                        with self.lock:
+                            self.results[host] = error_msg
+        return results
+
+
+HOST_RESOLVER = HostResolver()
+
+
+def resolve_hosts(hosts: Iterable[str], workers: int) -> Dict[str, str | None]:
+    """Resolves all given hosts with the cache of the current process and returns None for every host that resolves,
+    otherwise the DNS error reason."""
+    return HOST_RESOLVER.resolve(hosts, workers)
@@ -1,42 +1,179 @@
-"""This file contains both helper functions related with internet/ http requests."""
+"""This file contains all helper functions related with internet/ http requests."""
+import gzip
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from http.cookiejar import DefaultCookiePolicy
 from typing import Tuple
 
 import requests
-from orphan_detection.util.data_objects import PageResponse
+from requests.adapters import HTTPAdapter
+from tqdm import tqdm
 
-__all__ = ["probe_url", "download_page_content"]
+from orphan_detection import constants
+from orphan_detection.util.circuit_breaker import HostCircuitBreakers
+from orphan_detection.util.data_objects import PageResponse, ProbeResponse
+from orphan_detection.util.url_canonicalization import get_url_origin
 
+__all__ = ["HttpSessions", "configure_http_sessions", "get_http_sessions", "get_http_session", "probe_url",
+           "send_probe_request", "parse_retry_after", "download_page_content", "download_to_gzip_file"]
 
-def probe_url(url: str, timeout_after: float) -> Tuple[int, str | None]:
-    """Makes an HTTP-Head-Request for given url and returns its status code and None if successful.
-    In case of an error occurred it returns 0 and the error reason."""
+
+class HttpSessions:
+    """Shared requests session of the current process, which keeps the connections to every host alive.
+    Cookies are never stored, so every request is independent of the previous ones like single requests."""
+
+    def __init__(self, pool_hosts: int, pool_size: int):
+        self.pool_hosts = pool_hosts
+        self.pool_size = pool_size
+        self.lock = threading.Lock()
+        self.session = None
+        self.session_pid = None
+
+    def configure(self, pool_hosts: int, pool_size: int) -> None:
+        """Sets the amount of hosts with kept connections and the max amount of kept connections per host."""
+        with self.lock:
+            self.pool_hosts, self.pool_size = pool_hosts, pool_size
+            self.session = None
+
+    def get(self) -> requests.Session:
+        """Returns the session of the current process, child processes create their own session."""
+        with self.lock:
+            if self.session is None or self.session_pid != os.getpid():
+                session = requests.Session()
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                adapter = HTTPAdapter(pool_connections=self.pool_hosts, pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self.session, self.session_pid = session, os.getpid()
+            return self.session
+
+
+HTTP_SESSIONS = HttpSessions(constants.HTTP_POOL_DEFAULT_HOSTS, constants.HTTP_POOL_DEFAULT_SIZE)
+
+
+def configure_http_sessions(pool_hosts: int, pool_size: int) -> None:
+    """Configures the connection pools of the shared session for all following requests."""
+    HTTP_SESSIONS.configure(pool_hosts, pool_size)
+
+
+def get_http_sessions() -> HttpSessions:
+    """Returns the shared sessions of the current process with their connection pool configuration."""
+    return HTTP_SESSIONS
+
+
+def get_http_session() -> requests.Session:
+    """Returns the shared session with keep-alive connection pools per host."""
+    return HTTP_SESSIONS.get()
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Returns the time (in sec) to wait given in a Retry-After header as seconds or HTTP-date, None if invalid."""
+    if value is None:
+        return None
+    if value.strip().isdigit():
+        return float(value)
     try:
-        response_for_url = requests.head(url, timeout=timeout_after)
-        return response_for_url.status_code, None
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def send_probe_request(url: str, timeout_after: float) -> ProbeResponse:
+    """Makes an HTTP-Head-Request for given url and returns an util.ProbeResponse with its status code, latency and
+    the Retry-After time of the response. In case of an error occurred the status code is 0 with the error reason."""
+    start_time = time.monotonic()
+    try:
+        response_for_url = get_http_session().head(url, timeout=timeout_after)
+        return ProbeResponse(status_code=response_for_url.status_code, error_msg=None,
+                             latency=time.monotonic() - start_time,
+                             retry_after=parse_retry_after(response_for_url.headers.get("Retry-After")))
     except requests.exceptions.Timeout:
-        return 000, "Timeout"
+        error_msg = "Timeout"
     except requests.exceptions.SSLError as exc:
-        return 000, f"[ERROR] SSLError: {exc}"
+        error_msg = f"[ERROR] SSLError: {exc}"
     except requests.exceptions.ConnectionError as exc:
-        return 000, f"[ERROR] ConnectionError: {exc}"
+        error_msg = f"[ERROR] ConnectionError: {exc}"
     except Exception as exc:  # pylint: disable-msg=broad-except
-        return 000, str(exc)
+        error_msg = str(exc)
+    return ProbeResponse(status_code=000, error_msg=error_msg, latency=time.monotonic() - start_time, retry_after=None)
 
 
-def download_page_content(url: str, bytes_content: bool = True, **kwargs) -> PageResponse:
+def probe_url(url: str, timeout_after: float) -> Tuple[int, str | None]:
+    """Makes an HTTP-Head-Request for given url and returns its status code and None if successful.
+    In case of an error occurred it returns 0 and the error reason."""
+    response = send_probe_request(url, timeout_after)
+    return response.status_code, response.error_msg
+
+
+def download_page_content(url: str, bytes_content: bool = True, circuit_breakers: HostCircuitBreakers | None = None,
+                          **kwargs) -> PageResponse:
     """
     Downloads the content for given url in requested form and returns an
     util.PageResponse object with the collected data.
+    With circuit breakers, requests to origins with an open circuit breaker are not sent,
+    the error reason names the open breaker instead.
     :param url: url to download the content for
     :param bytes_content: flag to return the content in bytes form
+    :param circuit_breakers: circuit breakers to check and record the request with, None to send it unconditionally
     :param kwargs:
     :return: util.PageResponse with data about content, content-header, encoding and errors if occurred.
     """
+    origin = get_url_origin(url)
+    if circuit_breakers is not None and not circuit_breakers.allow_request(origin, time.monotonic()):
+        return PageResponse(error_msg=circuit_breakers.get_reason(origin), content="", content_header=None,
+                            encoding=None)
+
+    host_failed = False
     try:
-        response = requests.get(url, **kwargs)
+        response = get_http_session().get(url, **kwargs)
         page_content = response.text if not bytes_content else response.content
+        if circuit_breakers is not None:
+            circuit_breakers.record_result(origin, False, time.monotonic())
         return PageResponse(error_msg=None, content=page_content,
                             content_header=response.headers.get("Content-Type"), encoding=response.encoding)
+    except requests.exceptions.Timeout:
+        error_reason, host_failed = "Timeout", True
+    except requests.exceptions.SSLError:
+        error_reason = "SSLError"
+    except requests.exceptions.ConnectionError:
+        error_reason, host_failed = "ConnectionError", True
+    except Exception as exc:  # pylint: disable-msg=broad-except
+        error_reason = str(exc)
+    if circuit_breakers is not None:
+        circuit_breakers.record_result(origin, host_failed, time.monotonic())
+    return PageResponse(error_msg=error_reason, content="", content_header=None, encoding=None)
+
+
+def download_to_gzip_file(url: str, path: str, chunk_size: int = constants.DOWNLOAD_CHUNK_SIZE,
+                          user_restricted: bool = True, **kwargs) -> str | None:
+    """
+    Streams the content for given url chunk by chunk into a compressed file at given path,
+    so the response is never held in memory as a whole. The download rate is reported while downloading.
+    :param url: url to download the content for
+    :param path: path of the compressed file to write the content to
+    :param chunk_size: amount of bytes read from the response at once
+    :param user_restricted: flag to restrict the file permissions to the current user
+    :param kwargs:
+    :return: error message, if error happened during download, None if everything worked fine
+    """
+    part_path = f"{path}.part"
+    try:
+        with get_http_session().get(url, stream=True, **kwargs) as response:
+            if response.status_code != 200:
+                return f"Status code {response.status_code:03}"
+
+            with gzip.open(part_path, 'wb') as outfile, \
+                    tqdm(unit="B", unit_scale=True, unit_divisor=1024, desc=os.path.basename(path)) as progress:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    outfile.write(chunk)
+                    progress.update(len(chunk))
+
+        os.replace(part_path, path)
+        if user_restricted:
+            os.chmod(path, constants.CHMOD_USER_ONLY_FILE)
+        return None
     except requests.exceptions.Timeout:
         error_reason = "Timeout"
     except requests.exceptions.SSLError:
@@ -45,4 +182,7 @@ def download_page_content(url: str, bytes_content: bool = True, **kwargs) -> Pag
         error_reason = "ConnectionError"
     except Exception as exc:  # pylint: disable-msg=broad-except
         error_reason = str(exc)
-    return PageResponse(error_msg=error_reason, content="", content_header=None, encoding=None)
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+    return error_reason
@@ -1,12 +1,11 @@
 """This file contains some helper functions."""
 import hashlib
-import re
 import random
-from typing import List
+from typing import List, Tuple
 
 from orphan_detection import constants
 
-__all__ = ["fnv_1a_64", "get_md5_hash", "is_resource_url", "shuffle_candidates_list"]
+__all__ = ["fnv_1a_64", "get_md5_hash", "shuffle_candidates_list", "parse_probe_budget"]
 
 # FNV-1A Initialization Values
 FNV_1A_INIT_VALUE = 0xcbf29ce484222325
@@ -27,13 +26,23 @@ def get_md5_hash(text: str) -> str:
     return hashlib.md5(text.encode(constants.DEFAULT_ENCODING)).hexdigest()
 
 
-def is_resource_url(url: str) -> bool:
-    """Returns True if given url is identified as leading to a ressource like an image etc. Otherwise, returns False."""
-    filter_regex = re.compile(constants.FILTER_REGEX, re.IGNORECASE)
-    return filter_regex.match(url) is not None
-
-
 def shuffle_candidates_list(candidates_list: List[str]) -> List[str]:
     """Shuffles the list of candidate urls and returns it."""
     random.shuffle(candidates_list)
     return candidates_list
+
+
+def parse_probe_budget(budget: str) -> Tuple[float, int] | None:
+    """Returns the time budget (in sec) and request budget given as seconds ('600s') or amount of requests ('1000r'),
+    a number without unit is a time budget and 0 is unlimited. Returns None for an invalid or negative budget."""
+    budget = budget.strip().lower()
+    try:
+        if budget.endswith("r"):
+            time_budget, request_budget = 0.0, int(budget[:-1])
+        else:
+            time_budget, request_budget = float(budget[:-1] if budget.endswith("s") else budget), 0
+    except ValueError:
+        return None
+    if not (time_budget >= 0 and request_budget >= 0):  # negative or nan
+        return None
+    return time_budget, request_budget
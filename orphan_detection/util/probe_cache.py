@@ -0,0 +1,73 @@
+"""This file contains the persistent cache of probe results, reused by later runs for the same domain."""
+import sqlite3
+import time
+from typing import Dict, List, Tuple
+
+__all__ = ["ProbeCache"]
+
+# amount of urls looked up in a single query
+CACHE_LOOKUP_BATCH_SIZE = 500
+
+# amount of probe results written at once
+CACHE_COMMIT_SIZE = 100
+
+CREATE_PROBE_TABLE = "CREATE TABLE IF NOT EXISTS probes (url TEXT PRIMARY KEY, status_code INTEGER, " \
+                     "error_msg TEXT, probed_at REAL) WITHOUT ROWID"
+UPSERT_PROBE = "INSERT OR REPLACE INTO probes VALUES (?, ?, ?, ?)"
+SELECT_PROBES = "SELECT url, status_code, error_msg FROM probes WHERE probed_at >= ? " \
+                "AND status_code NOT IN (0, 429, 503) AND url IN ({PLACEHOLDERS})"
+
+
+class ProbeCache:
+    """
+    Persistent cache with the status code, error message and time of the last probe of every url.
+    Results older than the time to live, requests without response and throttled requests are not reused.
+    """
+
+    def __init__(self, cache_file: str, ttl: float):
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.connection = None
+        self.pending: List[Tuple[str, int, str | None, float]] = []
+
+    def __enter__(self) -> "ProbeCache":
+        self.connection = sqlite3.connect(self.cache_file)
+        self.connection.execute(CREATE_PROBE_TABLE)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        try:
+            self.flush()
+        finally:
+            self.connection.close()
+            self.connection = None
+
+    def lookup(self, urls: List[str]) -> Dict[str, Tuple[int, str | None]]:
+        """
+        Look up the cached probe results for all given urls.
+        :param urls: list of urls to look up
+        :return: mapping of urls with a valid cached result to their status code and error message
+        """
+        if self.ttl <= 0:
+            return {}
+        valid_from = time.time() - self.ttl
+        cached_results = {}
+        for batch_start in range(0, len(urls), CACHE_LOOKUP_BATCH_SIZE):
+            batch = urls[batch_start:batch_start + CACHE_LOOKUP_BATCH_SIZE]
+            query = SELECT_PROBES.format(PLACEHOLDERS=", ".join("?" * len(batch)))
+            for url, status_code, error_msg in self.connection.execute(query, [valid_from, *batch]):
+                cached_results[url] = status_code, error_msg
+        return cached_results
+
+    def store(self, url: str, status_code: int, error_msg: str | None) -> None:
+        """Stores the result of a probe, the results are written in batches."""
+        self.pending.append((url, status_code, error_msg, time.time()))
+        if len(self.pending) >= CACHE_COMMIT_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes all pending probe results to the cache."""
+        if self.pending:
+            with self.connection:
+                self.connection.executemany(UPSERT_PROBE, self.pending)
+            self.pending = []
@@ -0,0 +1,186 @@
+"""This file contains the engine to probe many urls concurrently with an adaptive request rate per host."""
+import heapq
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Deque, Dict, Iterator, List, Tuple
+
+from orphan_detection.util.circuit_breaker import get_circuit_breakers
+from orphan_detection.util.data_objects import ProbeParameters
+from orphan_detection.util.host_resolution import resolve_hosts
+from orphan_detection.util.internet_operations import send_probe_request
+from orphan_detection.util.rate_limiting import THROTTLE_STATUS_CODES, AdaptiveRateLimiter
+from orphan_detection.util.url_canonicalization import get_url_origin
+from orphan_detection.util.url_operations import get_url_host
+
+__all__ = ["HostScheduler", "ProbeBudget", "probe_urls"]
+
+# error reasons of probe requests counting as failure of the host for its circuit breaker
+HOST_FAILURE_ERRORS = ("Timeout", "[ERROR] ConnectionError")
+
+
+class HostScheduler:
+    """Queues of the urls left per origin (scheme, host and port) with their position in the probe order.
+    An origin is waiting until its next request may start, of all ready origins the one with the earliest next url
+    in the probe order is picked first."""
+
+    def __init__(self, urls: List[str]):
+        self.queues: Dict[str, Deque[Tuple[int, str]]] = {}
+        for position, url in enumerate(urls):
+            self.queues.setdefault(get_url_origin(url), deque()).append((position, url))
+        self.waiting_hosts = [(0.0, host) for host in self.queues]
+        self.ready_hosts = []
+
+    def __bool__(self) -> bool:
+        return bool(self.waiting_hosts or self.ready_hosts)
+
+    def schedule(self, host: str, ready_at: float) -> None:
+        """Schedules given host to be ready at given time, if it has urls left."""
+        if self.queues[host]:
+            heapq.heappush(self.waiting_hosts, (ready_at, host))
+
+    def pop_ready_host(self, now: float) -> str | None:
+        """Returns the ready host with the earliest next url in the probe order, None if no host is ready."""
+        while self.waiting_hosts and self.waiting_hosts[0][0] <= now:
+            _, host = heapq.heappop(self.waiting_hosts)
+            if self.queues[host]:  # all urls of the host may be returned without request meanwhile
+                heapq.heappush(self.ready_hosts, (self.queues[host][0][0], host))
+        return heapq.heappop(self.ready_hosts)[1] if self.ready_hosts else None
+
+    def get_wait_time(self, now: float) -> float | None:
+        """Returns the time (in sec) until the next host is ready, None if no host is waiting."""
+        return max(self.waiting_hosts[0][0] - now, 0.0) if self.waiting_hosts else None
+
+    def pop_url(self, host: str) -> Tuple[int, str]:
+        """Returns the next url of given host with its position in the probe order."""
+        return self.queues[host].popleft()
+
+    def pop_all_urls(self, host: str) -> Iterator[str]:
+        """Returns all urls left of given host, which is not scheduled any more."""
+        while self.queues[host]:
+            yield self.queues[host].popleft()[1]
+
+    def requeue(self, host: str, position: int, url: str, ready_at: float) -> None:
+        """Queues given url of the host again, the host is scheduled if it had no urls left."""
+        self.queues[host].append((position, url))
+        if len(self.queues[host]) == 1:
+            self.schedule(host, ready_at)
+
+    def stop(self) -> None:
+        """Stops scheduling all hosts, their urls left are not probed."""
+        self.waiting_hosts, self.ready_hosts = [], []
+
+
+class ProbeBudget:
+    """Budget of a probe run in time (in sec) and amount of requests, a budget of 0 is unlimited."""
+
+    def __init__(self, time_budget: float, request_budget: int):
+        self.end_time = time.monotonic() + time_budget if time_budget > 0 else None
+        self.requests_left = request_budget if request_budget > 0 else None
+
+    def is_exhausted(self, now: float) -> bool:
+        """Returns True if no further request may start."""
+        return (self.end_time is not None and now >= self.end_time) or self.requests_left == 0
+
+    def consume(self) -> None:
+        """Registers the start of a request."""
+        if self.requests_left is not None:
+            self.requests_left -= 1
+
+    def limit_wait_time(self, wait_time: float | None, now: float) -> float | None:
+        """Returns the wait time limited by the time left in the budget."""
+        if self.end_time is None:
+            return wait_time
+        time_left = max(self.end_time - now, 0.0)
+        return time_left if wait_time is None else min(wait_time, time_left)
+
+
+def probe_urls(urls: List[str], probe_params: ProbeParameters,  # pylint: disable-msg=too-many-locals
+               rate_limiter: AdaptiveRateLimiter | None = None) -> Iterator[Tuple[str, int, str | None]]:
+    """
+    Probe all urls with HTTP-Head-Requests in a thread pool. Urls of different hosts are probed concurrently
+    up to the concurrency limit, while the requests to the same host are spaced by the adaptive rate limiter.
+    The urls are probed in their given order as far as the hosts are ready, throttled urls are queued again
+    up to the max amount of retries. Once the probe budget is exhausted no further request is started,
+    the urls left are not returned.
+    All hosts are resolved up front, urls of hosts without DNS entry are returned right away with a DNS error.
+    The circuit breakers are kept per origin, so failures of one port or scheme do not stop the requests
+    to other services of the same host. The urls of an origin with an open circuit breaker are deferred until
+    the origin may be tested again, once it is given up its remaining urls are returned with the reason of the breaker.
+    :param urls: list of urls to probe in their priority order
+    :param probe_params: parameters for probe
+    :param rate_limiter: rate limiter collecting the statistics of every host, created from the parameters if None
+    :return: iterator over the url, status code and error message (None if successful) in order of completion
+    """
+    scheduler = HostScheduler(urls)
+    budget = ProbeBudget(probe_params.time_budget, probe_params.request_budget)
+
+    # skip all urls of unresolvable hosts
+    resolve_errors = resolve_hosts({get_url_host(origin) for origin in scheduler.queues}, probe_params.concurrency)
+    for origin in scheduler.queues:
+        if resolve_errors[get_url_host(origin)] is not None:
+            for url in scheduler.pop_all_urls(origin):
+                yield url, 000, resolve_errors[get_url_host(origin)]
+
+    if rate_limiter is None:
+        rate_limiter = AdaptiveRateLimiter.from_probe_parameters(probe_params)
+    circuit_breakers = get_circuit_breakers()
+    retries = {}
+
+    with ThreadPoolExecutor(max_workers=probe_params.concurrency) as executor:
+        running = {}
+        while scheduler or running:
+            # start requests of all ready hosts until the concurrency limit is reached
+            wait_time = None
+            while len(running) < probe_params.concurrency:
+                now = time.monotonic()
+                if budget.is_exhausted(now):
+                    scheduler.stop()
+                    break
+                origin = scheduler.pop_ready_host(now)
+                if origin is None:
+                    wait_time = budget.limit_wait_time(scheduler.get_wait_time(now), now)
+                    break
+                # requests are spaced per host, the circuit breakers are kept per origin
+                host = get_url_host(origin)
+                delay = max(rate_limiter.get_delay(host, now), circuit_breakers.get_delay(origin, now))
+                if delay > 0:
+                    scheduler.schedule(origin, now + delay)
+                    continue
+
+                # short-circuit all remaining urls of a given up origin
+                if circuit_breakers.has_given_up(origin):
+                    error_msg = circuit_breakers.get_reason(origin)
+                    for url in scheduler.pop_all_urls(origin):
+                        yield url, 000, error_msg
+                    continue
+                if not circuit_breakers.allow_request(origin, now):
+                    scheduler.schedule(origin, now + circuit_breakers.get_delay(origin, now))
+                    continue
+                rate_limiter.acquire(host, now)
+                budget.consume()
+                position, url = scheduler.pop_url(origin)
+                running[executor.submit(send_probe_request, url, probe_params.timeout)] = position, url
+                scheduler.schedule(origin, now + rate_limiter.get_delay(host, now))
+
+            if not running:
+                if wait_time is not None:
+                    time.sleep(wait_time)
+                continue
+
+            # wait for finished requests or the next ready host
+            finished, _ = wait(running, timeout=wait_time, return_when=FIRST_COMPLETED)
+            for future in finished:
+                (position, url), response = running.pop(future), future.result()
+                host, origin, now = get_url_host(url), get_url_origin(url), time.monotonic()
+                rate_limiter.register(host, response, now)
+                circuit_breakers.record_result(origin, (response.error_msg or "").startswith(HOST_FAILURE_ERRORS),
+                                               now)
+
+                # queue throttled urls again, the origin is ready again after the adapted delay of its host
+                if response.status_code in THROTTLE_STATUS_CODES and retries.get(url, 0) < probe_params.retries \
+                        and not budget.is_exhausted(now):
+                    retries[url] = retries.get(url, 0) + 1
+                    scheduler.requeue(origin, position, url, now + rate_limiter.get_delay(host, now))
+                    continue
+                yield url, response.status_code, response.error_msg
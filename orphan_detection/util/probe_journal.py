@@ -0,0 +1,101 @@
+"""This file contains the journal of the probe step, to resume an interrupted probe with the missing candidates."""
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List, TextIO, Tuple
+
+from orphan_detection import constants
+from orphan_detection.util.file_operations import delete_file, is_file, iterate_lines_from_file
+
+__all__ = ["ProbeJournal"]
+
+# amount of probe results written before the journal is synced to disk
+JOURNAL_SYNC_SIZE = 100
+
+# max time (in sec) between two syncs of the journal
+JOURNAL_SYNC_INTERVAL = 5
+
+
+def get_candidates_hash(probe_candidates: List[str]) -> str:
+    """Returns the MD-5 Hash of the sorted candidates, independent of their probe order."""
+    candidates_hash = hashlib.md5()
+    for url in sorted(probe_candidates):
+        candidates_hash.update(url.encode(constants.DEFAULT_ENCODING))
+        candidates_hash.update(b"\n")
+    return candidates_hash.hexdigest()
+
+
+class ProbeJournal:
+    """
+    Journal with the results of every probe of the current run. The first line holds the creation time
+    and the hash of the probed candidates, a journal older than the max age or of other candidates is discarded.
+    The max age is independent of the probe cache, so an interrupted probe is resumed even if the cache is not used.
+    Results are written immediately and synced to disk in batches.
+    """
+
+    def __init__(self, journal_file: str, max_age: float, probe_candidates: List[str]):
+        self.journal_file = journal_file
+        self.max_age = max_age
+        self.candidates_hash = get_candidates_hash(probe_candidates)
+        self.outfile: TextIO | None = None
+        self.unsynced = 0
+        self.synced_at = 0.0
+
+    def __enter__(self) -> "ProbeJournal":
+        if is_file(self.journal_file) and not self.is_valid():
+            delete_file(self.journal_file)
+        # the journal stays open until all results are written
+        self.outfile = open(self.journal_file, 'a',  # pylint: disable-msg=consider-using-with
+                            encoding=constants.DEFAULT_ENCODING)
+        os.chmod(self.journal_file, constants.CHMOD_USER_ONLY_FILE)
+        if self.outfile.tell() == 0:
+            self.outfile.write(json.dumps({"created_at": time.time(), "candidates": self.candidates_hash}) + "\n")
+            self.sync()
+        self.synced_at = time.monotonic()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        try:
+            self.sync()
+        finally:
+            self.outfile.close()
+            self.outfile = None
+
+    def is_valid(self) -> bool:
+        """Returns True if the existing journal is within the max age and belongs to the same candidates."""
+        try:
+            header = json.loads(next(iterate_lines_from_file(self.journal_file), ""))
+            return header["created_at"] >= time.time() - self.max_age and header["candidates"] == self.candidates_hash
+        except (ValueError, TypeError, KeyError):  # journal without or with a cut off header
+            return False
+
+    def read(self) -> Dict[str, Tuple[int, str | None]]:
+        """
+        Read the probe results of an interrupted run from the journal.
+        :return: mapping of already probed candidates to their status code and error message
+        """
+        journaled_results = {}
+        journal_lines = iterate_lines_from_file(self.journal_file)
+        next(journal_lines, None)  # skip header
+        for journal_line in journal_lines:
+            try:
+                status_code, error_msg, url = json.loads(journal_line)
+            except ValueError:  # line cut off by the interruption
+                continue
+            journaled_results[url] = status_code, error_msg
+        return journaled_results
+
+    def store(self, url: str, status_code: int, error_msg: str | None) -> None:
+        """Stores the result of a probe, the journal is synced to disk in batches or after the sync interval."""
+        self.outfile.write(json.dumps([status_code, error_msg, url]) + "\n")
+        self.unsynced += 1
+        if self.unsynced >= JOURNAL_SYNC_SIZE or time.monotonic() - self.synced_at >= JOURNAL_SYNC_INTERVAL:
+            self.sync()
+
+    def sync(self) -> None:
+        """Writes all buffered probe results to disk."""
+        self.outfile.flush()
+        os.fsync(self.outfile.fileno())
+        self.unsynced = 0
+        self.synced_at = time.monotonic()
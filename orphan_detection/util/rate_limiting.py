@@ -0,0 +1,207 @@
+"""This file contains all helper classes to limit the request rate per host."""
+from typing import Dict, List
+
+from orphan_detection.util.data_objects import ProbeParameters, ProbeResponse
+
+__all__ = ["TokenBucket", "HostRateLimiter", "HostStatistics", "AdaptiveRateLimiter"]
+
+# additive increase of the request rate (requests per sec) of a host after every fast response
+RATE_INCREASE = 0.1
+
+# multiplicative decrease of the request rate of a host after a throttled, timed out or slow response
+RATE_DECREASE_FACTOR = 0.5
+
+# weight of the latest latency in the smoothed latency of a host
+LATENCY_SMOOTHING = 0.2
+
+# share of the timeout from which on the smoothed latency of a host counts as slow
+SLOW_LATENCY_SHARE = 0.5
+
+# status codes of responses asking to send fewer requests
+THROTTLE_STATUS_CODES = frozenset({429, 503})
+
+# max time (in sec) a single Retry-After header blocks a host
+MAX_RETRY_AFTER = 300
+
+
+class TokenBucket:
+    """Token bucket refilled with a fixed rate (tokens per sec), a request may start once a whole token is available.
+    A bucket without rate never limits the requests."""
+
+    def __init__(self, rate: float | None, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = None
+
+    def refill(self, now: float) -> None:
+        """Adds the tokens refilled since the last update, limited by the capacity."""
+        if self.updated_at is not None and self.rate is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def get_delay(self, now: float) -> float:
+        """Returns the time (in sec) until a whole token is available."""
+        self.refill(now)
+        if self.rate is None or self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now: float) -> None:
+        """Takes one token out of the bucket."""
+        self.refill(now)
+        if self.rate is not None:
+            self.tokens -= 1
+
+
+class HostRateLimiter:
+    """Token buckets for every host, so two requests to the same host start at least one interval apart."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    def get_bucket(self, host: str) -> TokenBucket:
+        """Returns the token bucket of given host, created on its first request."""
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(1 / self.interval if self.interval > 0 else None)
+        return self.buckets[host]
+
+    def get_delay(self, host: str, now: float) -> float:
+        """Returns the time (in sec) until the next request to given host may start."""
+        return self.get_bucket(host).get_delay(now)
+
+    def acquire(self, host: str, now: float) -> None:
+        """Registers the start of a request to given host."""
+        self.get_bucket(host).consume(now)
+
+
+class HostStatistics:  # pylint: disable-msg=too-many-instance-attributes,too-few-public-methods
+    """Observed responses and timings of a single host."""
+    __slots__ = ("requests", "throttled", "timeouts", "latency", "first_start", "last_start", "blocked_until",
+                 "decreased_at")
+
+    def __init__(self):
+        self.requests = 0
+        self.throttled = 0
+        self.timeouts = 0
+        self.latency = None
+        self.first_start = None
+        self.last_start = None
+        self.blocked_until = 0.0
+        self.decreased_at = None
+
+    def get_effective_rate(self) -> float:
+        """Returns the amount of requests per sec between the start of the first and the start of the last request."""
+        if self.requests < 2 or self.last_start <= self.first_start:
+            return 0.0
+        return (self.requests - 1) / (self.last_start - self.first_start)
+
+
+class AdaptiveRateLimiter(HostRateLimiter):
+    """Token buckets for every host with a request rate adapted to the responses of the host (AIMD).
+    Every fast response increases the rate additively, every throttled (429/503), timed out or slow response
+    decreases it multiplicatively, always between the bounds given by the max and min interval.
+    The initial interval is never clamped, bounds not enclosing it are widened to it instead,
+    with both bounds at the initial interval the rate is kept fixed.
+    A Retry-After header blocks all requests to the host for the given time."""
+
+    def __init__(self, interval: float, min_interval: float, max_interval: float, slow_latency: float):
+        super().__init__(interval)
+        min_interval, max_interval = min(min_interval, interval), max(max_interval, interval)
+        self.adaptive = min_interval < max_interval
+        self.min_rate = 1 / max_interval if max_interval > 0 else None
+        self.max_rate = 1 / min_interval if min_interval > 0 else None
+        self.slow_latency = slow_latency
+        self.statistics: Dict[str, HostStatistics] = {}
+
+    @classmethod
+    def from_probe_parameters(cls, probe_params: ProbeParameters) -> "AdaptiveRateLimiter":
+        """Creates the rate limiter for the probe step, without interval bounds the interval is kept fixed."""
+        min_interval = probe_params.interval if probe_params.min_interval is None else probe_params.min_interval
+        max_interval = probe_params.interval if probe_params.max_interval is None else probe_params.max_interval
+        return cls(probe_params.interval, min_interval, max_interval, probe_params.timeout * SLOW_LATENCY_SHARE)
+
+    def get_statistics(self, host: str) -> HostStatistics:
+        """Returns the statistics of given host, created on its first request."""
+        if host not in self.statistics:
+            self.statistics[host] = HostStatistics()
+        return self.statistics[host]
+
+    def get_delay(self, host: str, now: float) -> float:
+        """Returns the time (in sec) until the next request to given host may start."""
+        return max(self.get_statistics(host).blocked_until - now, super().get_delay(host, now))
+
+    def acquire(self, host: str, now: float) -> None:
+        """Registers the start of a request to given host."""
+        super().acquire(host, now)
+        statistics = self.get_statistics(host)
+        if statistics.first_start is None:
+            statistics.first_start = now
+        statistics.last_start = now
+
+    def register(self, host: str, response: ProbeResponse, now: float) -> None:
+        """Registers the response of a request to given host and adapts the request rate of the host."""
+        statistics = self.get_statistics(host)
+        statistics.requests += 1
+        if statistics.latency is None:
+            statistics.latency = response.latency
+        else:
+            statistics.latency += LATENCY_SMOOTHING * (response.latency - statistics.latency)
+
+        if response.status_code in THROTTLE_STATUS_CODES:
+            statistics.throttled += 1
+            if response.retry_after is not None:
+                statistics.blocked_until = max(statistics.blocked_until, now + min(response.retry_after,
+                                                                                   MAX_RETRY_AFTER))
+            self.decrease_rate(host, now)
+        elif response.error_msg == "Timeout":
+            statistics.timeouts += 1
+            self.decrease_rate(host, now)
+        elif statistics.latency > self.slow_latency:
+            self.decrease_rate(host, now)
+        elif response.error_msg is None:
+            self.increase_rate(host)
+
+    def clamp_rate(self, rate: float) -> float:
+        """Returns the rate limited by the bounds of the rate limiter."""
+        if self.max_rate is not None:
+            rate = min(rate, self.max_rate)
+        if self.min_rate is not None:
+            rate = max(rate, self.min_rate)
+        return rate
+
+    def increase_rate(self, host: str) -> None:
+        """Increases the request rate of given host additively, an unlimited rate stays unlimited."""
+        bucket = self.get_bucket(host)
+        if self.adaptive and bucket.rate is not None:
+            bucket.rate = self.clamp_rate(bucket.rate + RATE_INCREASE)
+
+    def decrease_rate(self, host: str, now: float) -> None:
+        """Decreases the request rate of given host multiplicatively, at most once per interval of the host.
+        An unlimited rate is decreased starting from the effective rate of the host."""
+        if not self.adaptive:
+            return
+        bucket = self.get_bucket(host)
+        statistics = self.get_statistics(host)
+        if statistics.decreased_at is not None and bucket.rate is not None \
+                and now - statistics.decreased_at < 1 / bucket.rate:
+            return
+        current_rate = bucket.rate if bucket.rate is not None else statistics.get_effective_rate()
+        if current_rate <= 0 and self.min_rate is None:
+            return
+        bucket.refill(now)
+        bucket.rate = self.clamp_rate(current_rate * RATE_DECREASE_FACTOR)
+        bucket.tokens = min(bucket.tokens, 0.0)
+        statistics.decreased_at = now
+
+    def get_report(self) -> List[str]:
+        """Returns a line with the effective request rate, the final interval and the responses of every host."""
+        report = []
+        for host, statistics in sorted(self.statistics.items()):
+            rate = self.get_bucket(host).rate
+            interval = f"{1 / rate:8.3f}" if rate is not None else f"{0:8.3f}"
+            report.append(f"{statistics.get_effective_rate():8.2f} req/s {interval} sec interval "
+                          f"{statistics.requests:6} requests {statistics.throttled:6} throttled "
+                          f"{statistics.timeouts:6} timeouts {host}")
+        return report
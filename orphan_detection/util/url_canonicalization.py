@@ -0,0 +1,80 @@
+"""This file contains all functions to canonicalize urls and group urls leading to the same page."""
+from typing import Dict, FrozenSet, Iterable, List
+
+from orphan_detection import constants
+from orphan_detection.util.url_operations import URL_PATTERN
+
+__all__ = ["compile_canonicalization_rules", "canonicalize_url", "group_equivalent_urls", "get_url_origin"]
+
+# default ports per scheme, urls without scheme are treated as http urls
+DEFAULT_PORTS = {"": ":80", "http": ":80", "https": ":443"}
+
+
+def compile_canonicalization_rules(rules: Iterable[str]) -> FrozenSet[str] | None:
+    """Returns the set of lower case canonicalization rules, None if an unknown rule is given."""
+    compiled_rules = frozenset(rule.strip().lower() for rule in rules if rule.strip())
+    if not compiled_rules.issubset(constants.CANONICALIZATION_RULES):
+        return None
+    return compiled_rules
+
+
+def canonicalize_url(url: str, rules: FrozenSet[str]) -> str:
+    """
+    Returns the canonical form of given url, urls with the same canonical form lead to the same page.
+    :param url: url to canonicalize
+    :param rules: rules to apply: 'port' removes default ports, 'host' lower cases scheme and host,
+                  'slash' removes trailing slashes of the path, 'query' sorts the query parameters
+                  and 'www' removes a leading www. of the host
+    :return: canonical form of the url
+    """
+    match = URL_PATTERN.match(url)
+    host_start, host_end = match.span(1)
+    path_start, path_end = match.span(2)
+    scheme, separator, user = url[:host_start].rpartition("//")
+    host, port = url[host_start:host_end], url[host_end:path_start]
+    path, query_and_fragment = url[path_start:path_end], url[path_end:]
+
+    if "host" in rules:
+        scheme, host = scheme.lower(), host.lower()
+    if "www" in rules and host[:4].lower() == "www.":
+        host = host[4:]
+    if "port" in rules and port in (":", DEFAULT_PORTS.get(scheme.rstrip(":").lower())):
+        port = ""
+    if "slash" in rules:
+        path = path.rstrip("/")
+    if "query" in rules and query_and_fragment.startswith("?"):
+        query, _, fragment = query_and_fragment[1:].partition("#")
+        query_parameters = sorted(parameter for parameter in query.split("&") if parameter)
+        query_and_fragment = ("?" + "&".join(query_parameters) if query_parameters else "") \
+            + ("#" + fragment if fragment else "")
+    return scheme + separator + user + host + port + path + query_and_fragment
+
+
+def group_equivalent_urls(urls: List[str], rules: FrozenSet[str]) -> Dict[str, List[str]]:
+    """
+    Groups all urls by their canonical form. The representative of a group is the url in its canonical form
+    if it is part of the group, otherwise its first url.
+    :param urls: list of urls to group
+    :param rules: canonicalization rules to apply
+    :return: mapping of every representative to all urls of its group in their original order
+    """
+    groups = {}
+    for url in urls:
+        groups.setdefault(canonicalize_url(url, rules), []).append(url)
+
+    equivalent_urls = {}
+    for canonical_url, members in groups.items():
+        equivalent_urls[canonical_url if canonical_url in members else members[0]] = members
+    return equivalent_urls
+
+
+def get_url_origin(url: str) -> str:
+    """Returns the origin of given url as lower case scheme, host and effective port (e.g. http://example.com:80),
+    urls without scheme are treated as http urls."""
+    match = URL_PATTERN.match(url)
+    host_start, host_end = match.span(1)
+    scheme = url[:host_start].rpartition("//")[0].rstrip(":").lower() or "http"
+    port = url[host_end:match.start(2)]
+    if port in ("", ":"):
+        port = DEFAULT_PORTS.get(scheme, "")
+    return f"{scheme}://{url[host_start:host_end].lower()}{port}"
@@ -0,0 +1,164 @@
+"""This file contains all functions to parse urls into their components and classify them by their file extension."""
+import os
+import re
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import FrozenSet, Iterable, List, Tuple
+from urllib.parse import urljoin
+
+import numpy as np
+
+from orphan_detection import constants
+
+__all__ = ["ParsedUrls", "parse_urls", "select_parsed_urls", "get_host", "get_url_host", "get_host_ends", "get_path",
+           "get_extension", "compile_extension_filter", "get_url_extension", "is_resource_url", "filter_resource_urls",
+           "resolve_link"]
+
+# optional scheme (or protocol relative) and user info, host (or IPv6 address), optional port
+# and path until query or fragment
+URL_PATTERN = re.compile(r"(?:(?:[A-Za-z][A-Za-z0-9+.\-]*:)?//)?(?:[^/?#@]*@)?(\[[^\]/?#]*\]|[^/?#:]*)(?::[^/?#]*)?"
+                         r"([^?#]*)")
+
+# columns of the offsets of every parsed url
+HOST_START, HOST_END, PATH_START, PATH_END, EXTENSION_START, EXTENSION_END = range(6)
+
+
+@dataclass(frozen=True, slots=True)
+class ParsedUrls:
+    """Data Carrier class for a list of urls parsed once, with the start and end offsets of the host,
+    the path and the file extension of every url (one url per row)."""
+    urls: List[str]
+    offsets: np.ndarray
+
+
+def get_url_offsets(url: str) -> Tuple[int, int, int, int, int, int]:
+    """
+    Parse given url into the offsets of its components, query and fragment are not part of the path.
+    :param url: url to parse
+    :return: start and end offsets of the host, the path and the file extension (without the leading dot)
+    """
+    match = URL_PATTERN.match(url)
+    host_start, host_end = match.span(1)
+    path_start, path_end = match.span(2)
+
+    # the file extension is part of the last path segment, without path parameters
+    segment_start = url.rfind("/", path_start, path_end) + 1
+    if segment_start == 0:
+        return host_start, host_end, path_start, path_end, path_end, path_end
+    segment_end = url.find(";", segment_start, path_end)
+    if segment_end == -1:
+        segment_end = path_end
+    extension_dot = url.rfind(".", segment_start, segment_end)
+    extension_start = segment_end if extension_dot == -1 else extension_dot + 1
+    return host_start, host_end, path_start, path_end, extension_start, segment_end
+
+
+def get_offsets_matrix(urls: List[str]) -> np.ndarray:
+    """Returns the offsets of the components of all given urls, one url per row."""
+    offsets = array('i')
+    for url in urls:
+        offsets.extend(get_url_offsets(url))
+    return np.frombuffer(offsets, dtype=np.int32).reshape(len(urls), EXTENSION_END + 1)
+
+
+def parse_urls(urls: List[str], workers: int = 1) -> ParsedUrls:
+    """
+    Parse all urls into their components. Large lists are split into chunks and parsed in multiple processes.
+    :param urls: list of urls to parse
+    :param workers: max amount of processes to parse the urls with, limited by the amount of cpus
+    :return: parsed urls in their original order
+    """
+    workers = min(workers, os.cpu_count() or 1)
+    if workers <= 1 or len(urls) < constants.FILTER_PARALLEL_THRESHOLD:
+        return ParsedUrls(urls=urls, offsets=get_offsets_matrix(urls))
+
+    chunk_size = -(-len(urls) // workers)
+    chunks = [urls[chunk_start:chunk_start + chunk_size] for chunk_start in range(0, len(urls), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return ParsedUrls(urls=urls, offsets=np.concatenate(list(executor.map(get_offsets_matrix, chunks))))
+
+
+def select_parsed_urls(parsed_urls: ParsedUrls, selected: np.ndarray) -> ParsedUrls:
+    """Returns the parsed urls marked in the boolean array in their original order, without parsing them again."""
+    return ParsedUrls(urls=[url for url, is_selected in zip(parsed_urls.urls, selected.tolist()) if is_selected],
+                      offsets=parsed_urls.offsets[selected])
+
+
+def get_host(parsed_urls: ParsedUrls, index: int) -> str:
+    """Returns the host of the parsed url at given index."""
+    host_start, host_end = parsed_urls.offsets[index, HOST_START:HOST_END + 1].tolist()
+    return parsed_urls.urls[index][host_start:host_end]
+
+
+def get_url_host(url: str) -> str:
+    """Returns the lower case host of given url."""
+    host_start, host_end, *_ = get_url_offsets(url)
+    return url[host_start:host_end].lower()
+
+
+def get_host_ends(parsed_urls: ParsedUrls) -> np.ndarray:
+    """Returns the end offsets of the hosts of all parsed urls."""
+    return parsed_urls.offsets[:, HOST_END]
+
+
+def get_path(parsed_urls: ParsedUrls, index: int) -> str:
+    """Returns the path (without query and fragment) of the parsed url at given index."""
+    path_start, path_end = parsed_urls.offsets[index, PATH_START:PATH_END + 1].tolist()
+    return parsed_urls.urls[index][path_start:path_end]
+
+
+def get_extension(parsed_urls: ParsedUrls, index: int) -> str:
+    """Returns the lower case file extension of the parsed url at given index, empty string if it has none."""
+    extension_start, extension_end = parsed_urls.offsets[index, EXTENSION_START:EXTENSION_END + 1].tolist()
+    return parsed_urls.urls[index][extension_start:extension_end].lower()
+
+
+def compile_extension_filter(extensions: Iterable[str]) -> FrozenSet[str]:
+    """Returns the set of lower case file extensions (without leading dot) to identify ressource urls with."""
+    return frozenset(extension.strip().lstrip(".").lower() for extension in extensions if extension.strip(" ."))
+
+
+DEFAULT_EXTENSION_FILTER = compile_extension_filter(constants.LIST_OF_FILTER_FILE_ENDINGS)
+
+
+def get_url_extension(url: str) -> str:
+    """
+    Extract the file extension of the last path segment of given url, query, fragment and path parameters are ignored.
+    :param url: url to extract the file extension from
+    :return: lower case file extension without the leading dot, empty string if the path has no file extension
+    """
+    *_, extension_start, extension_end = get_url_offsets(url)
+    return url[extension_start:extension_end].lower()
+
+
+def is_resource_url(url: str, extension_filter: FrozenSet[str] = DEFAULT_EXTENSION_FILTER) -> bool:
+    """Returns True if given url is identified as leading to a ressource like an image etc. Otherwise, returns False."""
+    return get_url_extension(url) in extension_filter
+
+
+def filter_resource_urls(parsed_urls: ParsedUrls,
+                         extension_filter: FrozenSet[str] = DEFAULT_EXTENSION_FILTER) -> ParsedUrls:
+    """
+    Filter out all urls identified as leading to a ressource file by their parsed file extensions.
+    :param parsed_urls: parsed urls to filter
+    :param extension_filter: set of file extensions to identify ressource urls with
+    :return: parsed remaining urls in their original order
+    """
+    extension_starts = parsed_urls.offsets[:, EXTENSION_START].tolist()
+    extension_ends = parsed_urls.offsets[:, EXTENSION_END].tolist()
+    is_page = np.fromiter((url[extension_start:extension_end].lower() not in extension_filter
+                           for url, extension_start, extension_end
+                           in zip(parsed_urls.urls, extension_starts, extension_ends)),
+                          dtype=bool, count=len(parsed_urls.urls))
+    return select_parsed_urls(parsed_urls, is_page)
+
+
+def resolve_link(url: str, link: str) -> str:
+    """
+    Resolve a link found on the page of given url, relative links are resolved against the url.
+    :param url: url of the page the link was found on
+    :param link: absolute or relative link
+    :return: absolute url of the link
+    """
+    return urljoin(url, link.strip())